@@ -1,26 +1,138 @@
-import uvicorn
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import time
+from urllib.parse import urlencode
+
 from jinja2 import Template
 from markupsafe import Markup
 from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from starlette.responses import HTMLResponse
-from starlette.staticfiles import StaticFiles
+from starlette.responses import (HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response,
+                                 StreamingResponse)
 from starlette.templating import Jinja2Templates
 from starlette_wtf import CSRFProtectMiddleware
 
-from forms.hecs_debt_form import HecsDebtForm
-from utils.UserHecsCalculations import UserHecsTax
-from views.hecs_calculator import get_values_from_ato_table, calculate_hecs_repayments
+from forms.hecs_debt_form import HecsDebtForm, HecsDebtQueryForm
+from hecs_core.repayment_engine import ScheduleMonth
+from utils.ato_fetcher import AtoFetcher
+from utils.config import ApplicationConfig
+from utils.metrics import ATO_FETCH_FAILURES, NEVER_REPAID, mark_stage, registry, request_timer, timed_stage
+from utils.middleware import MetricsMiddleware, ProfilerMiddleware
+from utils.rate_store import RateStore
+from utils.responses import (CachedStaticFiles, ContentCodingETagMiddleware, ExcludePathsMiddleware,
+                             RequestStreamingResponse)
+from utils.result_cache import ResultCache
+from utils.scenarios import (ProjectionRequest, Scenario, ScenarioError, SolveRequest, calculate_scenario,
+                             calculate_scenarios, iter_scenario_schedule, parse_projection_request, parse_scenario,
+                             parse_solve_request, project_scenario, solve_payoff_target)
+from utils.shared_rates import SharedRateStore
+
+ATO_HELP_THRESHOLD_URL = ApplicationConfig.ATO_HELP_THRESHOLD_URL
+ATO_HELP_INDEXATION_URL = ApplicationConfig.ATO_HELP_INDEXATION_URL
 
-ATO_HELP_THRESHOLD_URL = "https://www.ato.gov.au/Rates/HELP,-TSL-and-SFSS-repayment-thresholds-and-rates/"
-ATO_HELP_INDEXATION_URL = "https://www.ato.gov.au/Rates/Study-and-training-loan-indexation-rates/"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+API_CHUNK_SIZE = 1000
+SCHEDULE_MEDIA_TYPES = {"ndjson": NDJSON_MEDIA_TYPE, "csv": "text/csv"}
 
 templates = Jinja2Templates(directory='templates')
 
-app = Starlette(debug=True, middleware=[Middleware(SessionMiddleware, secret_key='***REPLACEME1***'),
-                                        Middleware(CSRFProtectMiddleware, csrf_secret='***REPLACEME2***')])
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+def _templates_digest(*template_names) -> str:
+    digest = hashlib.sha256()
+    for template_name in template_names:
+        with open(f"templates/{template_name}", "rb") as template_file:
+            digest.update(template_file.read())
+    return digest.hexdigest()[:16]
+
+
+# Part of every results ETag, so a deploy that changes the page markup invalidates cached copies
+TEMPLATES_DIGEST = _templates_digest("hecs_calculator.html", "hecs_results.html")
+
+
+ato_fetcher = AtoFetcher()
+
+
+async def load_ato_tables():
+    # Only needed when the tables are refreshed, workers following a shared snapshot never load the parser
+    from utils.UserHecsCalculations import parse_ato_table
+
+    try:
+        with timed_stage("ato_fetch"):
+            threshold_page, indexation_page = await asyncio.gather(ato_fetcher.fetch(ATO_HELP_THRESHOLD_URL),
+                                                                   ato_fetcher.fetch(ATO_HELP_INDEXATION_URL))
+
+        # Parsing is CPU bound, keep it off the event loop
+        with timed_stage("ato_parse"):
+            income_threshold_brackets = await run_in_threadpool(parse_ato_table, threshold_page)
+            yearly_indexation_rates = await run_in_threadpool(parse_ato_table, indexation_page, 2)
+    except Exception:
+        ATO_FETCH_FAILURES.inc()
+        raise
+    return income_threshold_brackets, yearly_indexation_rates
+
+
+if ApplicationConfig.ATO_SHARED_RATES_PATH:
+    rate_store = SharedRateStore(load_ato_tables, snapshot_path=ApplicationConfig.ATO_RATE_SNAPSHOT_PATH,
+                                 ttl=ApplicationConfig.ATO_RATE_TTL_SECONDS,
+                                 retry_interval=ApplicationConfig.ATO_RATE_RETRY_SECONDS,
+                                 shared_path=ApplicationConfig.ATO_SHARED_RATES_PATH,
+                                 poll_interval=ApplicationConfig.ATO_SHARED_RATES_POLL_SECONDS)
+else:
+    rate_store = RateStore(load_ato_tables, snapshot_path=ApplicationConfig.ATO_RATE_SNAPSHOT_PATH,
+                           ttl=ApplicationConfig.ATO_RATE_TTL_SECONDS,
+                           retry_interval=ApplicationConfig.ATO_RATE_RETRY_SECONDS)
+
+result_cache = ResultCache(maxsize=ApplicationConfig.RESULT_CACHE_SIZE, ttl=ApplicationConfig.RESULT_CACHE_TTL_SECONDS)
+# Rendered results blocks of the calculator page and their never repaid flag, keyed the same way as the results
+fragment_cache = ResultCache(maxsize=ApplicationConfig.RESULT_CACHE_SIZE,
+                             ttl=ApplicationConfig.RESULT_CACHE_TTL_SECONDS)
+
+
+def _rate_table_age():
+    tables = rate_store.tables
+    return time.time() - tables.fetched_at if tables is not None else None
+
+
+registry.gauge_callback("hecs_result_cache_hits_total", "Calculator result cache hits",
+                        lambda: result_cache.hits, metric_type="counter")
+registry.gauge_callback("hecs_result_cache_misses_total", "Calculator result cache misses",
+                        lambda: result_cache.misses, metric_type="counter")
+registry.gauge_callback("hecs_result_cache_entries", "Calculator results currently cached", lambda: len(result_cache))
+registry.gauge_callback("hecs_ato_upstream_requests_total", "Requests sent to the ATO website",
+                        lambda: ato_fetcher.upstream_requests, metric_type="counter")
+registry.gauge_callback("hecs_rate_table_age_seconds", "Age of the ATO rate tables being served", _rate_table_age)
+
+METRICS_ROUTES = ("/", "/HECS", "/HECS/calculator", "/HECS/results", "/HECS/api/calculate", "/HECS/api/solve",
+                  "/HECS/api/project", "/HECS/api/schedule", "/metrics")
+
+# The API streams NDJSON and CSV as it is produced, compression would hold it back until the whole body is ready
+UNCOMPRESSED_PATHS = ("/HECS/api/",)
+
+try:
+    # brotli-asgi is optional, it serves brotli to clients that accept it and falls back to gzip for the rest
+    from brotli_asgi import BrotliMiddleware as CompressionMiddleware
+except ImportError:
+    CompressionMiddleware = GZipMiddleware
+
+COMPRESSION_MIDDLEWARE = Middleware(ExcludePathsMiddleware, middleware_class=CompressionMiddleware,
+                                    exclude_prefixes=UNCOMPRESSED_PATHS,
+                                    minimum_size=ApplicationConfig.COMPRESSION_MINIMUM_SIZE)
+
+app = Starlette(debug=True, middleware=[Middleware(MetricsMiddleware, routes=METRICS_ROUTES),
+                                        Middleware(ContentCodingETagMiddleware),
+                                        COMPRESSION_MIDDLEWARE,
+                                        Middleware(ProfilerMiddleware, enabled=ApplicationConfig.PROFILING_ENABLED),
+                                        Middleware(SessionMiddleware, secret_key='***REPLACEME1***'),
+                                        Middleware(CSRFProtectMiddleware, csrf_secret='***REPLACEME2***')],
+                on_startup=[rate_store.start], on_shutdown=[rate_store.stop, ato_fetcher.aclose])
+app.mount("/static", CachedStaticFiles(directory="static", max_age=ApplicationConfig.STATIC_MAX_AGE_SECONDS),
+          name="static")
 
 
 @app.route('/')
@@ -43,91 +155,348 @@ async def homepage(request):
 @app.route('/HECS/calculator', methods=['GET', 'POST'])
 async def calculator(request):
     form = await HecsDebtForm.from_formdata(request)
+
+    # Results live at their own GET url so browsers and CDNs can cache and revalidate them
+    if await form.validate_on_submit():
+        return RedirectResponse(_results_url(form), status_code=303)
+
+    with request_timer() as timer:
+        html = _render_calculator_page(form, "POST", "/HECS/calculator")
+    return HTMLResponse(html, headers={"Server-Timing": timer.server_timing()})
+
+
+@app.route('/HECS/results')
+async def calculator_results(request):
+    with request_timer() as timer:
+        # A GET form with no session state, so the page is the same for every visitor and needs no CSRF token
+        form = HecsDebtQueryForm(formdata=request.query_params)
+        if not form.validate():
+            html = _render_calculator_page(form, "GET", "/HECS/results")
+            return HTMLResponse(html, headers={"Server-Timing": timer.server_timing()})
+
+        with timed_stage("rates"):
+            rate_tables = await rate_store.get()
+
+        inputs = (form.annual_income.data, form.hecs_debt.data, form.weekly_voluntary_repayments.data)
+        etag = _results_etag(inputs, rate_tables.version)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={ApplicationConfig.RESULTS_MAX_AGE_SECONDS}"}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={**headers, "Server-Timing": timer.server_timing()})
+
+        # The never repaid flag is cached with the rendered block, so every page that shows one is counted
+        fragment_cache.use_rate_table_version(rate_tables.version)
+        fragment = fragment_cache.get(inputs)
+        if fragment is None:
+            scenario_result = calculate_scenario(Scenario(*inputs), rate_tables, result_cache)
+            never_repaid = any(scenario_result[result]["never_repaid"] for result in ("involuntary", "voluntary"))
+            fragment = (_render_results(*inputs, scenario_result), never_repaid)
+            fragment_cache.set(inputs, fragment)
+        else:
+            mark_stage("fragment", "hit")
+
+        results_html, never_repaid = fragment
+        if never_repaid:
+            NEVER_REPAID.inc()
+
+        html = _render_calculator_page(form, "GET", "/HECS/results", results_html)
+    return HTMLResponse(html, headers={**headers, "Server-Timing": timer.server_timing()})
+
+
+def _results_url(form) -> str:
+    return "/HECS/results?" + urlencode({"annual_income": form.annual_income.data, "hecs_debt": form.hecs_debt.data,
+                                         "weekly_voluntary_repayments": form.weekly_voluntary_repayments.data})
+
+
+def _results_etag(inputs, rate_table_version: str) -> str:
+    # Strong validator, the page only changes with the inputs, the ATO rates or a redeploy of the templates. This is
+    # the ETag of the identity body, ContentCodingETagMiddleware gives compressed bodies their own
+    payload = json.dumps([inputs, rate_table_version, TEMPLATES_DIGEST], separators=(",", ":"))
+    return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
+
+
+def _etag_matches(request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def _render_calculator_page(form, form_method: str, form_action: str, results_html: str = "") -> str:
+    with timed_stage("render"):
+        t = templates.get_template("hecs_calculator.html")
+        return t.render(form=form, form_method=form_method, form_action=form_action, results_html=Markup(results_html))
+
+
+def _render_results(annual_income, hecs_debt, weekly_repayments, scenario_result: dict) -> str:
+    """The results block of the calculator page, rendered once per inputs and rate table version."""
     display_strings = []
     error_strings = []
     display_output = False
 
-    if await form.validate_on_submit():
-        income_threshold_brackets = get_values_from_ato_table(ATO_HELP_THRESHOLD_URL)
-        yearly_indexation_rates = get_values_from_ato_table(ATO_HELP_INDEXATION_URL, 2)
+    index_rate = scenario_result["average_indexation_rate"]
+    mandatory_repayment = scenario_result["mandatory_repayment"]
+    involuntary_result = scenario_result["involuntary"]
+    voluntary_result = scenario_result["voluntary"]
+
+    if not (involuntary_result["never_repaid"] or voluntary_result["never_repaid"]):
+        # Total indexed amount of debt
+        total_involuntary_index = involuntary_result["total_indexation"]
+        total_voluntary_index = voluntary_result["total_indexation"]
+        involuntary_months = involuntary_result["months"]
+        voluntary_months = voluntary_result["months"]
+
+        # Append all strings that need to be displayed to the user to a list
+        # display_strings.append(f"Annual Income: <b>${annual_income:,}</b>")
+        display_strings.append(Markup(f"${annual_income:,}"))
+        display_strings.append(Markup(f"${hecs_debt:,}"))
+        display_strings.append(
+            Markup(
+                f"${mandatory_repayment:,} ({scenario_result['tax_bracket_rate']}%)"))
+        display_strings.append(Markup(f"${weekly_repayments:,.0f}"))
+        display_strings.append(Markup(f"{round(index_rate * 100, 2)}%"))
+        display_strings.append(Markup(
+            f"Approximate voluntary repayment length:<br> <b>{int(voluntary_months / 12)} years {voluntary_months % 12} months</b> "
+            f"<i>(${hecs_debt + total_voluntary_index :,.2f} total debt)</i>"))
+        display_strings.append(Markup(
+            f"Approximate involuntary repayment length:<br> <b>{int(involuntary_months / 12)} years {involuntary_months % 12} months</b> "
+            f"<i>(${hecs_debt + total_involuntary_index:,.2f} total debt)</i>"))
+        year_difference = int(involuntary_months / 12) - int(voluntary_months / 12)
+        try:
+            times_quicker = involuntary_months / voluntary_months
+        except ZeroDivisionError:
+            times_quicker = 0
+        display_strings.append(
+            Markup(
+                f"It is approximately <b>{times_quicker:.2f}x</b> <i>({year_difference} years)</i> faster "
+                f"and <b>${total_involuntary_index - total_voluntary_index:,.2f} cheaper</b> "
+                f"to make <b>${weekly_repayments:,.2f} weekly payments</b> "
+                f"<i>(${weekly_repayments * 52:,.2f} Annually)</i>"))
+        display_strings.append(Markup(
+            f"You would earn approximately <b>${mandatory_repayment * year_difference:,.2f}</b> "
+            f"over the course of the <b>{year_difference} years</b> you would have been paying mandatory HECS tax"))
+        display_strings.append(
+            Markup(f"With the combined savings and extra earnings, you would have approximately "
+                   f"<span style='color:green'><b>${((mandatory_repayment * year_difference) * 0.675) + (total_involuntary_index - total_voluntary_index):,.2f}</b> more in your pocket "
+                   f"after <b>{int(involuntary_months / 12)} years</b></span>, compared to <span style='color:red'>$0 if you make no voluntary repayments</span>"))
+        display_output = True
 
-        # Set variables based on form data input
-        annual_income = form.annual_income.data
-        hecs_debt = form.hecs_debt.data
-        weekly_repayments = form.weekly_voluntary_repayments.data
-        monthly_repayments = (weekly_repayments * 52) / 12
+    else:
+        if annual_income < scenario_result['repayment_threshold']:
+            error_strings.append(Markup(
+                f"Your annual income of <b>${annual_income:,}</b> is not high enough to automatically pay HECS debt tax<br><br>"
+                f"The minimum annual income for automatic repayments is <b>${scenario_result['repayment_threshold']:,.2f}</b><br><br>"
+                f"At a minimum, you should voluntarily repay <b>${(hecs_debt * index_rate) / 52:,.2f} per week (${hecs_debt * index_rate:,.2f} Annually)</b> "
+                f"to negate average annual loan indexation<br><br>"
+                f"A good rule of thumb is to set aside enough money to offset indexation and pay a little extra off the loan. <i>Usually</i> 2-5% of you annual income will cover this<br><br>"
+                f"In this case, <b>2-5%</b> of <u>${annual_income:,.2f}</u> is <b>${annual_income * 0.02:,.2f}-${annual_income * 0.05:,.2f}</b>"))
+        else:
+            error_strings.append(Markup(
+                f"Your annual income of <b>${annual_income:,.2f}</b> is likely not high enough to repay your HECS debt of <b>${hecs_debt:,.2f}</b> <span style='color:red'>without voluntary repayments</span><br><br>"
+                f"You should voluntarily repay <b>${(hecs_debt * index_rate) / 52:,.2f} per week (${hecs_debt * index_rate:,.2f} Annually)</b> "
+                f"at a minimum to negate average annual loan indexation<br><br>"
+                f"Your specified weekly voluntary repayments of <b>${weekly_repayments:,.2f}</b> total <b>${weekly_repayments * 52:,.2f}</b> annually<br><br>"
+                f"Choosing to <b>not make any voluntary repayments</b> will <b>exponentially increase the amount of time</b> it takes you to pay off your debt!"))
 
-        user_hecs_tax = UserHecsTax(annual_income, income_threshold_brackets, yearly_indexation_rates)
-        index_rate = user_hecs_tax.average_yearly_indexation_rate
+    with timed_stage("render_results"):
+        t = templates.get_template("hecs_results.html")
+        return t.render(display_strings=display_strings, error_strings=error_strings, display_output=display_output)
 
+
+@app.route('/HECS/api/calculate', methods=['POST'])
+async def api_calculate(request):
+    rate_tables = await rate_store.get()
+    headers = {"X-Rate-Table-Version": rate_tables.version}
+
+    # NDJSON bodies are read line by line, so a batch is never held in memory as a whole
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        payloads = _iter_ndjson_payloads(request)
+    else:
         try:
-            involuntary_values, total_of_indexed_values = calculate_hecs_repayments(hecs_debt,
-                                                                                    user_hecs_tax.average_yearly_indexation_rate,
-                                                                                    user_hecs_tax.user_income_hecs_tax_amount,
-                                                                                    0, False)
-            # Total indexed amount of debt
-            total_involuntary_index = (sum(total_of_indexed_values))
-
-            voluntary_values, total_of_indexed_values = calculate_hecs_repayments(hecs_debt,
-                                                                                  user_hecs_tax.average_yearly_indexation_rate,
-                                                                                  user_hecs_tax.user_income_hecs_tax_amount,
-                                                                                  monthly_repayments,
-                                                                                  True)
-
-            total_voluntary_index = (sum(total_of_indexed_values))
-            # Append all strings that need to be displayed to the user to a list
-            # display_strings.append(f"Annual Income: <b>${annual_income:,}</b>")
-            display_strings.append(Markup(f"${annual_income:,}"))
-            display_strings.append(Markup(f"${hecs_debt:,}"))
-            display_strings.append(
-                Markup(
-                    f"${user_hecs_tax.user_income_hecs_tax_amount:,} ({user_hecs_tax.user_tax_bracket_tax_rate}%)"))
-            display_strings.append(Markup(f"${weekly_repayments:,.0f}"))
-            display_strings.append(Markup(f"{round(index_rate * 100, 2)}%"))
-            display_strings.append(Markup(
-                f"Approximate voluntary repayment length:<br> <b>{int(len(voluntary_values) / 12)} years {len(voluntary_values) % 12} months</b> "
-                f"<i>(${hecs_debt + total_voluntary_index :,.2f} total debt)</i>"))
-            display_strings.append(Markup(
-                f"Approximate involuntary repayment length:<br> <b>{int(len(involuntary_values) / 12)} years {len(involuntary_values) % 12} months</b> "
-                f"<i>(${hecs_debt + total_involuntary_index:,.2f} total debt)</i>"))
-            year_difference = int(len(involuntary_values) / 12) - int(len(voluntary_values) / 12)
+            payload = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+
+        if isinstance(payload, dict):
             try:
-                times_quicker = len(involuntary_values) / len(voluntary_values)
-            except ZeroDivisionError:
-                times_quicker = 0
-            display_strings.append(
-                Markup(
-                    f"It is approximately <b>{times_quicker:.2f}x</b> <i>({year_difference} years)</i> faster "
-                    f"and <b>${total_involuntary_index - total_voluntary_index:,.2f} cheaper</b> "
-                    f"to make <b>${weekly_repayments:,.2f} weekly payments</b> "
-                    f"<i>(${weekly_repayments * 52:,.2f} Annually)</i>"))
-            display_strings.append(Markup(
-                f"You would earn approximately <b>${user_hecs_tax.user_income_hecs_tax_amount * year_difference:,.2f}</b> "
-                f"over the course of the <b>{year_difference} years</b> you would have been paying mandatory HECS tax"))
-            display_strings.append(
-                Markup(f"With the combined savings and extra earnings, you would have approximately "
-                       f"<span style='color:green'><b>${((user_hecs_tax.user_income_hecs_tax_amount * year_difference) * 0.675) + (total_involuntary_index - total_voluntary_index):,.2f}</b> more in your pocket "
-                       f"after <b>{int(len(involuntary_values) / 12)} years</b></span>, compared to <span style='color:red'>$0 if you make no voluntary repayments</span>"))
-            display_output = True
-
-
-        except RecursionError:
-            if annual_income < user_hecs_tax.tax_brackets_min:
-                error_strings.append(Markup(
-                    f"Your annual income of <b>${annual_income:,}</b> is not high enough to automatically pay HECS debt tax<br><br>"
-                    f"The minimum annual income for automatic repayments is <b>${user_hecs_tax.tax_brackets_min:,.2f}</b><br><br>"
-                    f"At a minimum, you should voluntarily repay <b>${(hecs_debt * index_rate) / 52:,.2f} per week (${hecs_debt * index_rate:,.2f} Annually)</b> "
-                    f"to negate average annual loan indexation<br><br>"
-                    f"A good rule of thumb is to set aside enough money to offset indexation and pay a little extra off the loan. <i>Usually</i> 2-5% of you annual income will cover this<br><br>"
-                    f"In this case, <b>2-5%</b> of <u>${annual_income:,.2f}</u> is <b>${annual_income * 0.02:,.2f}-${annual_income * 0.05:,.2f}</b>"))
-            else:
-                error_strings.append(Markup(
-                    f"Your annual income of <b>${annual_income:,.2f}</b> is likely not high enough to repay your HECS debt of <b>${hecs_debt:,.2f}</b> <span style='color:red'>without voluntary repayments</span><br><br>"
-                    f"You should voluntarily repay <b>${(hecs_debt * index_rate) / 52:,.2f} per week (${hecs_debt * index_rate:,.2f} Annually)</b> "
-                    f"at a minimum to negate average annual loan indexation<br><br>"
-                    f"Your specified weekly voluntary repayments of <b>${weekly_repayments:,.2f}</b> total <b>${weekly_repayments * 52:,.2f}</b> annually<br><br>"
-                    f"Choosing to <b>not make any voluntary repayments</b> will <b>exponentially increase the amount of time</b> it takes you to pay off your debt!"))
-
-    t = templates.get_template("hecs_calculator.html")
-    html = t.render(form=form, display_strings=display_strings, error_strings=error_strings, display_output=display_output)
-    return HTMLResponse(html)
+                scenario = parse_scenario(payload)
+            except ScenarioError as error:
+                return JSONResponse({"error": str(error)}, status_code=400, headers=headers)
+            return JSONResponse(calculate_scenario(scenario, rate_tables, result_cache), headers=headers)
+
+        if not isinstance(payload, list):
+            return JSONResponse({"error": "Request body must be a scenario or a list of scenarios"},
+                                status_code=400)
+        payloads = _iter_list_payloads(payload)
+
+    return RequestStreamingResponse(_stream_scenario_results(payloads, rate_tables), media_type=NDJSON_MEDIA_TYPE,
+                                    headers=headers)
+
+
+async def _read_number_payload(request, fields) -> dict:
+    # GET requests carry the numbers in the query string, anything else in a JSON body. Only ``fields`` are read
+    # from the query string, other parameters like cache busters are left alone
+    if request.method == "GET":
+        payload = {}
+        for field in fields:
+            if field in request.query_params:
+                try:
+                    payload[field] = float(request.query_params[field])
+                except ValueError:
+                    raise ValueError(f"'{field}' must be a number") from None
+        return payload
+
+    try:
+        return await request.json()
+    except ValueError:
+        raise ValueError("Request body must be JSON") from None
+
+
+@app.route('/HECS/api/solve', methods=['GET', 'POST'])
+async def api_solve(request):
+    try:
+        payload = await _read_number_payload(request, SolveRequest._fields)
+    except ValueError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    try:
+        solve_request = parse_solve_request(payload)
+    except ScenarioError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    rate_tables = await rate_store.get()
+    return JSONResponse(solve_payoff_target(solve_request, rate_tables),
+                        headers={"X-Rate-Table-Version": rate_tables.version})
+
+
+@app.route('/HECS/api/project', methods=['GET', 'POST'])
+async def api_project(request):
+    try:
+        payload = await _read_number_payload(request, ProjectionRequest._fields)
+    except ValueError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    try:
+        projection_request = parse_projection_request(payload)
+    except ScenarioError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    rate_tables = await rate_store.get()
+    return JSONResponse(project_scenario(projection_request, rate_tables),
+                        headers={"X-Rate-Table-Version": rate_tables.version})
+
+
+@app.route('/HECS/api/schedule', methods=['GET', 'POST'])
+async def api_schedule(request):
+    output_format = request.query_params.get("format", "ndjson")
+    if output_format not in SCHEDULE_MEDIA_TYPES:
+        return JSONResponse({"error": f"'format' must be one of {', '.join(SCHEDULE_MEDIA_TYPES)}"}, status_code=400)
+
+    try:
+        payload = await _read_number_payload(request, Scenario._fields)
+    except ValueError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    try:
+        scenario = parse_scenario(payload)
+    except ScenarioError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    rate_tables = await rate_store.get()
+    headers = {"X-Rate-Table-Version": rate_tables.version}
+    if output_format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="hecs-schedule.csv"'
+
+    # Rows are produced while the response is sent, a year of them per chunk
+    rows = iter_scenario_schedule(scenario, rate_tables)
+    body = _iter_schedule_csv(rows) if output_format == "csv" else _iter_schedule_ndjson(rows)
+    return StreamingResponse(body, media_type=SCHEDULE_MEDIA_TYPES[output_format], headers=headers)
+
+
+@app.route('/metrics')
+async def metrics(request):
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+async def _iter_list_payloads(payloads):
+    for payload in payloads:
+        yield payload
+
+
+async def _iter_ndjson_payloads(request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_ndjson_line(line)
+
+    if buffer.strip():
+        yield _decode_ndjson_line(buffer)
+
+
+def _decode_ndjson_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return ScenarioError("Line is not valid JSON")
+
+
+async def _stream_scenario_results(payloads, rate_tables):
+    chunk = []
+    async for payload in payloads:
+        chunk.append(payload)
+        if len(chunk) >= API_CHUNK_SIZE:
+            yield await run_in_threadpool(_calculate_payload_chunk, chunk, rate_tables)
+            chunk = []
+
+    if chunk:
+        yield await run_in_threadpool(_calculate_payload_chunk, chunk, rate_tables)
+
+
+def _calculate_payload_chunk(payloads, rate_tables):
+    # Invalid scenarios get an error line in their place so results stay in request order
+    lines = [None] * len(payloads)
+    scenarios = []
+    scenario_positions = []
+    for position, payload in enumerate(payloads):
+        try:
+            if isinstance(payload, ScenarioError):
+                raise payload
+            scenarios.append(parse_scenario(payload))
+            scenario_positions.append(position)
+        except ScenarioError as error:
+            lines[position] = {"error": str(error)}
+
+    for position, result in zip(scenario_positions, calculate_scenarios(scenarios, rate_tables, result_cache)):
+        lines[position] = result
+
+    return "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines)
+
+
+def _iter_schedule_chunks(rows, rows_per_chunk=12):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= rows_per_chunk:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def _iter_schedule_ndjson(rows):
+    for chunk in _iter_schedule_chunks(rows):
+        yield "".join(json.dumps(row._asdict(), separators=(",", ":")) + "\n" for row in chunk)
+
+
+def _iter_schedule_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ScheduleMonth._fields)
+    for chunk in _iter_schedule_chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
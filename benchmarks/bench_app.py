@@ -0,0 +1,90 @@
+"""End to end benchmarks driving the Starlette app in process against a local stand-in ATO server."""
+import asyncio
+import os
+import re
+import tempfile
+
+import httpx
+
+from benchmarks.common import time_coroutine
+from fixtures.ato_server import running_ato_server
+
+CSRF_TOKEN_PATTERN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+FORM_DATA = {"annual_income": 90000, "hecs_debt": 30000, "weekly_voluntary_repayments": 50}
+SCENARIO = {"annual_income": 90000, "hecs_debt": 30000, "weekly_voluntary_repayments": 50}
+BATCH = [{"annual_income": 40000 + index * 50, "hecs_debt": 10000 + index * 40, "weekly_voluntary_repayments": index % 100}
+         for index in range(1000)]
+
+
+async def _run_requests(hecs_app, min_time: float) -> dict:
+    results = {}
+    await hecs_app.app.router.startup()
+    try:
+        async with httpx.AsyncClient(app=hecs_app.app, base_url="http://testserver") as client:
+            results["app.rates.load"] = await time_coroutine(hecs_app.load_ato_tables, min_time)
+
+            async def get_calculator():
+                return await client.get("/HECS/calculator")
+
+            results["app.calculator.get"] = await time_coroutine(get_calculator, min_time)
+
+            csrf_token = CSRF_TOKEN_PATTERN.search((await get_calculator()).text).group(1)
+
+            async def post_calculator():
+                response = await client.post("/HECS/calculator", data={**FORM_DATA, "csrf_token": csrf_token})
+                assert response.status_code == 303
+                return response
+
+            results_url = (await post_calculator()).headers["location"]
+
+            async def get_results():
+                response = await client.get(results_url)
+                assert response.status_code == 200
+                return response
+
+            async def get_results_uncached():
+                hecs_app.result_cache.clear()
+                hecs_app.fragment_cache.clear()
+                return await get_results()
+
+            etag = (await get_results()).headers["etag"]
+
+            async def get_results_not_modified():
+                response = await client.get(results_url, headers={"If-None-Match": etag})
+                assert response.status_code == 304
+                return response
+
+            results["app.calculator.post"] = await time_coroutine(post_calculator, min_time)
+            results["app.calculator.results"] = await time_coroutine(get_results, min_time)
+            results["app.calculator.results_uncached"] = await time_coroutine(get_results_uncached, min_time)
+            results["app.calculator.results_not_modified"] = await time_coroutine(get_results_not_modified, min_time)
+
+            async def api_calculate():
+                return await client.post("/HECS/api/calculate", json=SCENARIO)
+
+            async def api_calculate_batch():
+                hecs_app.result_cache.clear()
+                return await client.post("/HECS/api/calculate", json=BATCH)
+
+            async def api_solve():
+                return await client.get("/HECS/api/solve", params={"annual_income": 60000, "hecs_debt": 80000,
+                                                                   "target_years": 5})
+
+            results["app.api.calculate"] = await time_coroutine(api_calculate, min_time)
+            results["app.api.calculate_batch_1000"] = await time_coroutine(api_calculate_batch, min_time)
+            results["app.api.solve"] = await time_coroutine(api_solve, min_time)
+    finally:
+        await hecs_app.app.router.shutdown()
+    return results
+
+
+def run(min_time: float) -> dict:
+    import app as hecs_app
+
+    with running_ato_server() as server, tempfile.TemporaryDirectory() as snapshot_directory:
+        hecs_app.ATO_HELP_THRESHOLD_URL = server.threshold_url
+        hecs_app.ATO_HELP_INDEXATION_URL = server.indexation_url
+        hecs_app.rate_store.snapshot_path = os.path.join(snapshot_directory, "ato_rate_snapshot.json")
+
+        return asyncio.run(_run_requests(hecs_app, min_time))
@@ -0,0 +1,32 @@
+"""Bracket lookup micro benchmarks."""
+from benchmarks.common import time_callable
+from fixtures.ato_server import load_ato_page
+from hecs_core.bracket_table import CompiledBracketTable
+from hecs_core.hecs_tax import UserHecsTax
+from utils.UserHecsCalculations import TableValuesFromURL
+
+# Below the threshold, inside a bracket, exactly on a boundary and above the top bracket
+INCOMES = {
+    "nil": 30000,
+    "middle": 90000,
+    "boundary": 55837,
+    "top": 250000,
+}
+
+
+def run(min_time: float) -> dict:
+    income_threshold_brackets = TableValuesFromURL.from_text(load_ato_page("thresholds.html")).table_values
+    yearly_indexation_rates = TableValuesFromURL.from_text(load_ato_page("indexation.html"), 2).table_values
+    bracket_table = CompiledBracketTable(income_threshold_brackets)
+
+    results = {
+        "brackets.compile": time_callable(lambda: CompiledBracketTable(income_threshold_brackets), min_time),
+    }
+    for name, income in INCOMES.items():
+        results[f"brackets.rate_for.{name}"] = time_callable(lambda: bracket_table.rate_for(income), min_time)
+        results[f"brackets.user_hecs_tax.{name}"] = time_callable(
+            lambda: UserHecsTax(income, bracket_table, yearly_indexation_rates), min_time)
+
+    results["brackets.user_hecs_tax.raw_table"] = time_callable(
+        lambda: UserHecsTax(INCOMES["middle"], income_threshold_brackets, yearly_indexation_rates), min_time)
+    return results
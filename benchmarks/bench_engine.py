@@ -0,0 +1,60 @@
+"""Repayment simulation micro benchmarks across small and huge debts."""
+from benchmarks.common import time_callable
+from hecs_core.rate_schedule import IndexationSchedule
+from hecs_core.repayment_engine import simulate_repayments
+from hecs_core.repayment_solver import minimum_weekly_repayment
+
+INDEX_RATE = 0.0249
+# Last 10 years of ATO indexation, oldest first, to compare replaying history against the flat rate
+INDEX_HISTORY = IndexationSchedule((0.024, 0.021, 0.029, 0.015, 0.015, 0.019, 0.018, 0.018, 0.006, 0.039))
+
+# (debt, compulsory repayment, monthly voluntary repayment)
+SCENARIOS = {
+    "small": (5000, 5400, 216.67),
+    "typical": (30000, 5400, 0),
+    "large": (120000, 9000, 433.33),
+    "huge": (1000000, 25000, 0),
+    "never_repaid": (80000, 1500, 0),
+}
+
+BATCH_SIZES = (1000, 100000)
+
+
+def run(min_time: float) -> dict:
+    results = {}
+    for name, (hecs_debt, mandatory_repayment, monthly_repayment) in SCENARIOS.items():
+        results[f"engine.simulate.{name}"] = time_callable(
+            lambda: simulate_repayments(hecs_debt, INDEX_RATE, mandatory_repayment, monthly_repayment), min_time)
+        results[f"engine.simulate_history.{name}"] = time_callable(
+            lambda: simulate_repayments(hecs_debt, INDEX_HISTORY, mandatory_repayment, monthly_repayment), min_time)
+
+    results["engine.solve.typical"] = time_callable(
+        lambda: minimum_weekly_repayment(80000, INDEX_RATE, 1500, 60), min_time)
+
+    try:
+        import numpy as np
+        from hecs_core.batch_engine import simulate_repayments_batch
+    except ImportError:
+        pass
+    else:
+        generator = np.random.default_rng(0)
+        for batch_size in BATCH_SIZES:
+            hecs_debts = generator.integers(1000, 150000, batch_size)
+            mandatory_repayments = generator.integers(0, 15000, batch_size)
+            results[f"engine.batch.{batch_size}"] = time_callable(
+                lambda: simulate_repayments_batch(hecs_debts, INDEX_RATE, mandatory_repayments), min_time)
+            results[f"engine.batch_history.{batch_size}"] = time_callable(
+                lambda: simulate_repayments_batch(hecs_debts, INDEX_HISTORY, mandatory_repayments), min_time)
+
+    # The legacy recursive simulation lives in the Flask views, only benchmark it when Flask is around
+    try:
+        from views.hecs_calculator import calculate_hecs_repayments
+    except ImportError:
+        pass
+    else:
+        for name in ("small", "typical", "large"):
+            hecs_debt, mandatory_repayment, monthly_repayment = SCENARIOS[name]
+            results[f"engine.legacy_recursive.{name}"] = time_callable(
+                lambda: calculate_hecs_repayments(hecs_debt, INDEX_RATE, mandatory_repayment, monthly_repayment,
+                                                  bool(monthly_repayment)), min_time)
+    return results
@@ -0,0 +1,58 @@
+"""Cold import time and peak RSS of each layer, every sample in a fresh interpreter like a new worker."""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import summarise
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "" is the bare interpreter, the RSS every other entry starts from
+MODULES = {
+    "baseline": "",
+    "hecs_core": "hecs_core",
+    "scenarios": "utils.scenarios",
+    "app": "app",
+    # The legacy Flask blueprints app.py used to import through views/__init__.py
+    "legacy_views": "views",
+}
+
+_IMPORT_SCRIPT = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+if sys.argv[1]:
+    importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def _import_once(module: str) -> dict:
+    completed = subprocess.run([sys.executable, "-c", _IMPORT_SCRIPT, module], cwd=REPOSITORY_DIRECTORY,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise ImportError(completed.stderr.strip().splitlines()[-1] if completed.stderr else module)
+    return json.loads(completed.stdout)
+
+
+def run(min_time: float, repeat: int = 5) -> dict:
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        # Peak RSS comes from getrusage, which is Unix only
+        return {}
+
+    results = {}
+    for name, module in MODULES.items():
+        try:
+            samples = [_import_once(module) for _ in range(repeat)]
+        except ImportError:
+            # Dependencies of that layer aren't installed
+            continue
+
+        stats = summarise([sample["seconds"] for sample in samples], 1)
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        stats["max_rss_kb"] = max(sample["max_rss"] for sample in samples) / (1024 if sys.platform == "darwin" else 1)
+        results[f"imports.{name}"] = stats
+    return results
@@ -0,0 +1,25 @@
+"""Parser micro benchmarks on the saved ATO fixture pages."""
+from benchmarks.common import time_callable
+from fixtures.ato_server import load_ato_page
+from utils.UserHecsCalculations import PARSER_BACKENDS, TableValuesFromURL
+
+PAGES = {
+    "thresholds": ("thresholds.html", 0),
+    "indexation": ("indexation.html", 2),
+}
+
+
+def run(min_time: float) -> dict:
+    results = {}
+    for page_name, (file_name, cut_leading_rows) in PAGES.items():
+        page = load_ato_page(file_name)
+        for backend in PARSER_BACKENDS:
+            try:
+                TableValuesFromURL.from_text(page, cut_leading_rows, backend)
+            except ImportError:
+                # Optional backend that isn't installed
+                continue
+
+            results[f"parser.{page_name}.{backend}"] = time_callable(
+                lambda: TableValuesFromURL.from_text(page, cut_leading_rows, backend), min_time)
+    return results
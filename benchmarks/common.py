@@ -0,0 +1,50 @@
+import statistics
+import time
+import timeit
+from typing import Callable, Dict, List
+
+
+def summarise(timings: List[float], loops: int) -> Dict[str, float]:
+    # Timings are seconds per call, reported in microseconds
+    per_call = sorted(timing * 1e6 for timing in timings)
+    return {
+        "min_us": per_call[0],
+        "median_us": statistics.median(per_call),
+        "mean_us": statistics.fmean(per_call),
+        "max_us": per_call[-1],
+        "loops": loops,
+        "repeat": len(per_call),
+    }
+
+
+def time_callable(func: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+
+    # Pick a loop count that runs for at least min_time, like timeit's own autorange
+    loops = 1
+    while True:
+        if timer.timeit(loops) >= min_time:
+            break
+        loops *= 2 if loops < 1000 else 10
+
+    return summarise([timing / loops for timing in timer.repeat(repeat, loops)], loops)
+
+
+async def time_coroutine(func: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> Dict[str, float]:
+    # Calibrate the loop count the same way as time_callable
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            await func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            await func()
+        timings.append((time.perf_counter() - start) / loops)
+    return summarise(timings, loops)
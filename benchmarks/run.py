@@ -0,0 +1,85 @@
+"""Run the benchmark suite and save the results as JSON so runs can be compared between commits.
+
+    python -m benchmarks.run                       # everything, saved to benchmarks/results/<commit>.json
+    python -m benchmarks.run parser engine         # only some suites
+    python -m benchmarks.run --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+SUITES = ("parser", "brackets", "engine", "app", "imports")
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suites(suites, min_time: float) -> dict:
+    results = {}
+    for suite in suites:
+        module = importlib.import_module(f"benchmarks.bench_{suite}")
+        print(f"Running {suite} benchmarks", file=sys.stderr)
+        results.update(module.run(min_time))
+    return results
+
+
+def print_results(results: dict, baseline: dict = None):
+    name_width = max(len(name) for name in results)
+    for name, stats in results.items():
+        line = f"{name:<{name_width}}  {stats['median_us']:>12.2f} us"
+        if baseline and name in baseline:
+            # Above 1.00x is faster than the baseline
+            line += f"  {baseline[name]['median_us'] / stats['median_us']:>6.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the HECS calculator benchmarks")
+    parser.add_argument("suites", nargs="*", help=f"suites to run out of {', '.join(SUITES)}, all by default")
+    parser.add_argument("--output", help="JSON file to write, defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare medians against")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timing loop")
+    args = parser.parse_args()
+
+    unknown_suites = set(args.suites) - set(SUITES)
+    if unknown_suites:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown_suites))}")
+
+    commit = _git_commit()
+    results = run_suites(args.suites or SUITES, args.min_time)
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    print_results(results, baseline)
+    print(f"\nSaved to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
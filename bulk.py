@@ -0,0 +1,229 @@
+"""Run the calculator over a CSV of scenarios without the web app, e.g. a nightly HR export.
+
+    python bulk.py employees.csv -o results.csv
+    python bulk.py employees.csv -o results.parquet --processes 8
+    cat employees.csv | python bulk.py - > results.csv
+
+The input needs annual_income and hecs_debt columns, weekly_voluntary_repayments and indexation_years are optional.
+Any other columns, e.g. an employee id, are copied to the front of every output row so results join back to the input.
+Rates come from the snapshot the web app writes (HECS_ATO_RATE_SNAPSHOT_PATH), the ATO is never contacted.
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+from utils.config import ApplicationConfig
+from utils.rate_store import RateStore, RateTables
+from utils.scenarios import Scenario, ScenarioError, calculate_scenarios, parse_scenario
+
+RESULT_FIELDS = ("tax_bracket_rate", "mandatory_repayment", "repayment_threshold", "average_indexation_rate")
+REPAYMENT_FIELDS = ("months", "total_indexation", "total_debt", "never_repaid")
+OUTPUT_FIELDS = (Scenario._fields + RESULT_FIELDS
+                 + tuple(f"{repayment}_{field}" for repayment in ("involuntary", "voluntary")
+                         for field in REPAYMENT_FIELDS)
+                 + ("error",))
+
+# Set in every worker process by _init_worker
+_rate_tables: Optional[RateTables] = None
+
+
+def load_rate_tables(snapshot_path: str) -> RateTables:
+    rate_store = RateStore(None, snapshot_path=snapshot_path)
+    if not rate_store.load_snapshot():
+        raise SystemExit(f"No usable rate snapshot at {snapshot_path}, run the web app once to create one")
+    return rate_store.tables
+
+
+def _init_worker(snapshot_path: str):
+    global _rate_tables
+    _rate_tables = load_rate_tables(snapshot_path)
+
+
+def passthrough_fields(input_fields) -> tuple:
+    """Input columns copied to the output as they are, everything but the scenario and result columns."""
+    return tuple(field for field in input_fields or () if field not in OUTPUT_FIELDS)
+
+
+def _parse_row(row: dict) -> Scenario:
+    # Blank cells fall back to the scenario defaults
+    payload = {}
+    for field in Scenario._fields:
+        value = row.get(field)
+        if value is None or not value.strip():
+            continue
+        try:
+            payload[field] = float(value)
+        except ValueError:
+            raise ScenarioError(f"'{field}' must be a number") from None
+    return parse_scenario(payload)
+
+
+def _result_to_row(result: dict) -> tuple:
+    row = [result[field] for field in Scenario._fields + RESULT_FIELDS]
+    for repayment in ("involuntary", "voluntary"):
+        row.extend(result[repayment][field] for field in REPAYMENT_FIELDS)
+    row.append(None)
+    return tuple(row)
+
+
+def calculate_chunk(rows: List[dict], copied_fields: Tuple[str, ...] = ()) -> List[tuple]:
+    """Output rows for a chunk of input rows, in the same order, with the error column set on invalid rows.
+
+    Each output row starts with the ``copied_fields`` of its input row.
+    """
+    output = [None] * len(rows)
+    scenarios = []
+    scenario_positions = []
+    for position, row in enumerate(rows):
+        copied_values = tuple(row.get(field) for field in copied_fields)
+        try:
+            scenarios.append(_parse_row(row))
+            scenario_positions.append(position)
+            output[position] = copied_values
+        except ScenarioError as error:
+            output[position] = (*copied_values, *(row.get(field) for field in Scenario._fields),
+                                *(None for _ in range(len(OUTPUT_FIELDS) - len(Scenario._fields) - 1)), str(error))
+
+    for position, result in zip(scenario_positions, calculate_scenarios(scenarios, _rate_tables)):
+        output[position] += _result_to_row(result)
+    return output
+
+
+def _iter_chunks(rows: Iterator[dict], chunk_size: int) -> Iterator[List[dict]]:
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_results(pool, chunks: Iterator[List[dict]], copied_fields: Tuple[str, ...],
+                  max_pending: int) -> Iterator[List[tuple]]:
+    # Pool.imap reads its whole input ahead of the workers, a bounded window of chunks in flight keeps memory
+    # steady however large the input is, and results still come back in input order
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(calculate_chunk, (chunk, copied_fields)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+
+    while pending:
+        yield pending.popleft().get()
+
+
+class CsvResultWriter:
+    def __init__(self, output_file, copied_fields: Tuple[str, ...] = ()):
+        self._writer = csv.writer(output_file)
+        self._writer.writerow(copied_fields + OUTPUT_FIELDS)
+
+    def write(self, rows: List[tuple]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class ParquetResultWriter:
+    """Writes every chunk as its own row group, so the whole result set is never held in memory."""
+
+    def __init__(self, output_path: str, copied_fields: Tuple[str, ...] = ()):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._copied_field_count = len(copied_fields)
+        # Copied columns stay the text they were in the CSV
+        self._schema = pa.schema(
+            [(field, pa.string()) for field in copied_fields]
+            + [(field, pa.float64()) for field in Scenario._fields[:-1]] + [("indexation_years", pa.int64())]
+            + [(field, pa.float64()) for field in RESULT_FIELDS]
+            + [(f"{repayment}_{field}", field_type) for repayment in ("involuntary", "voluntary")
+               for field, field_type in (("months", pa.int64()), ("total_indexation", pa.float64()),
+                                         ("total_debt", pa.float64()), ("never_repaid", pa.bool_()))]
+            + [("error", pa.string())])
+        self._writer = pq.ParquetWriter(output_path, self._schema)
+
+    def write(self, rows: List[tuple]):
+        columns = list(zip(*rows))
+        # Invalid rows carry the raw CSV text in their input columns, which doesn't fit the typed columns
+        for position in range(self._copied_field_count, self._copied_field_count + len(Scenario._fields)):
+            columns[position] = [value if row[-1] is None else None for value, row in zip(columns[position], rows)]
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def _peak_memory_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS, children only counts finished workers
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the HECS calculator over a CSV of scenarios")
+    parser.add_argument("input", help="CSV file of scenarios, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="CSV or .parquet file to write, stdout by default")
+    parser.add_argument("--format", choices=("csv", "parquet"), help="output format, from the extension by default")
+    parser.add_argument("--snapshot", default=ApplicationConfig.ATO_RATE_SNAPSHOT_PATH, help="rate snapshot file")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="scenarios per worker task")
+    args = parser.parse_args()
+
+    output_format = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    if output_format == "parquet" and args.output == "-":
+        parser.error("parquet output needs an --output file")
+
+    # Fail before starting any workers when the snapshot is missing
+    load_rate_tables(args.snapshot)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    reader = csv.DictReader(input_file)
+    copied_fields = passthrough_fields(reader.fieldnames)
+    output_file = None
+    if output_format == "parquet":
+        try:
+            writer = ParquetResultWriter(args.output, copied_fields)
+        except ImportError:
+            parser.error("parquet output needs pyarrow installed")
+    else:
+        output_file = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        writer = CsvResultWriter(output_file, copied_fields)
+
+    row_count = 0
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.processes, initializer=_init_worker, initargs=(args.snapshot,)) as pool:
+            chunks = _iter_chunks(iter(reader), args.chunk_size)
+            for rows in _iter_results(pool, chunks, copied_fields, max_pending=args.processes * 2):
+                writer.write(rows)
+                row_count += len(rows)
+    finally:
+        writer.close()
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not None and output_file is not sys.stdout:
+            output_file.close()
+
+    elapsed = time.perf_counter() - start
+    peak_memory = _peak_memory_mb()
+    print(f"{row_count:,} rows in {elapsed:.2f}s ({row_count / elapsed if elapsed else 0:,.0f} rows/s)"
+          + (f", peak memory {peak_memory:,.1f} MB" if peak_memory is not None else ""), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Local stand-in for the ATO rate pages, serving the saved fixtures in ``fixtures/ato_pages``.
+
+Run it with ``python -m fixtures.ato_server`` and point the app at it through ``HECS_ATO_THRESHOLD_URL``
+and ``HECS_ATO_INDEXATION_URL``, or use :func:`running_ato_server` to start one in a background thread.
+"""
+import argparse
+import contextlib
+import hashlib
+import os
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ATO_PAGES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ato_pages")
+
+THRESHOLD_PATH = "/thresholds"
+INDEXATION_PATH = "/indexation"
+
+ATO_PAGES = {
+    THRESHOLD_PATH: "thresholds.html",
+    INDEXATION_PATH: "indexation.html",
+}
+
+
+def load_ato_page(name: str) -> str:
+    with open(os.path.join(ATO_PAGES_DIRECTORY, name), encoding="utf-8") as page_file:
+        return page_file.read()
+
+
+class AtoRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.request_count += 1
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+
+        body, etag = page
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.server.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AtoServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, verbose: bool = False):
+        super().__init__(address, AtoRequestHandler)
+        self.verbose = verbose
+        self.request_count = 0
+        self.last_modified = formatdate(usegmt=True)
+        self.pages = {}
+        for path, name in ATO_PAGES.items():
+            body = load_ato_page(name).encode("utf-8")
+            self.pages[path] = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def threshold_url(self) -> str:
+        return self.base_url + THRESHOLD_PATH
+
+    @property
+    def indexation_url(self) -> str:
+        return self.base_url + INDEXATION_PATH
+
+
+@contextlib.contextmanager
+def running_ato_server(host: str = "127.0.0.1", port: int = 0):
+    server = AtoServer((host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the saved ATO rate pages locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    server = AtoServer((args.host, args.port), verbose=True)
+    print(f"Thresholds: {server.threshold_url}\nIndexation: {server.indexation_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from forms.hecs_debt_form import HecsDebtForm
+from forms.hecs_debt_form import HecsDebtForm, HecsDebtQueryForm
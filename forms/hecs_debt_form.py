@@ -1,9 +1,10 @@
 from starlette_wtf import StarletteForm
-from wtforms import IntegerField, SubmitField
+from wtforms import Form, IntegerField, SubmitField
 from wtforms.validators import DataRequired, NumberRange
 
 
-class HecsDebtForm(StarletteForm):
+class HecsDebtQueryForm(Form):
+    # Plain WTForms form for the results url, StarletteForm always turns CSRF back on when the middleware is installed
     number_error = "<span style='color:red'>Please enter a positive number</span>"
 
     annual_income = IntegerField("Annual Income", validators=[DataRequired(message=number_error),
@@ -16,3 +17,7 @@ class HecsDebtForm(StarletteForm):
                                                validators=[DataRequired(message=number_error),
                                                            NumberRange(min=0, message=number_error)])
     calculate = SubmitField("Calculate!")
+
+
+class HecsDebtForm(StarletteForm, HecsDebtQueryForm):
+    pass
@@ -0,0 +1,6 @@
+from hecs_core.bracket_table import CompiledBracketTable, compile_bracket_table
+from hecs_core.hecs_tax import UserHecsTax
+from hecs_core.projection import Projection, ProjectionYear, project_repayments
+from hecs_core.rate_schedule import IndexationSchedule, indexation_schedules
+from hecs_core.repayment_engine import RepaymentResult, ScheduleMonth, iter_repayment_schedule, simulate_repayments
+from hecs_core.repayment_solver import PayoffPoint, minimum_weekly_repayment, payoff_curve
@@ -0,0 +1,151 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from hecs_core.bracket_table import compile_bracket_table
+from hecs_core.rate_schedule import IndexRate, IndexationSchedule, average_indexation_schedule
+from hecs_core.repayment_engine import MAX_SIMULATION_YEARS
+
+
+class BatchRepaymentResults(NamedTuple):
+    months: np.ndarray
+    total_indexation: np.ndarray
+    never_repaid: np.ndarray
+
+
+class BatchScenarioResults(NamedTuple):
+    tax_bracket_rates: np.ndarray
+    mandatory_repayments: np.ndarray
+    average_yearly_indexation_rate: float
+    involuntary: BatchRepaymentResults
+    voluntary: BatchRepaymentResults
+
+
+def _as_float_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def find_tax_bracket_rates(annual_incomes, income_threshold_brackets) -> np.ndarray:
+    """Vectorised ``CompiledBracketTable.rate_for`` for an array of annual incomes."""
+    bracket_table = compile_bracket_table(income_threshold_brackets)
+    lower_bounds = np.asarray(bracket_table.lower_bounds, dtype=np.float64)
+    rates = np.asarray(bracket_table.rates, dtype=np.float64)
+
+    # Same as bisect_right, an income on a boundary falls in the bracket starting there
+    bracket_indexes = np.searchsorted(lower_bounds, _as_float_array(annual_incomes), side="right") - 1
+    return np.where(bracket_indexes >= 0, rates[np.maximum(bracket_indexes, 0)], bracket_table.min_rate)
+
+
+def calculate_mandatory_repayments(annual_incomes, tax_bracket_rates) -> np.ndarray:
+    """Vectorised ``UserHecsTax._calculate_user_hecs_tax_amount``, a 0% bracket repays nothing."""
+    annual_incomes = _as_float_array(annual_incomes)
+    tax_bracket_rates = _as_float_array(tax_bracket_rates)
+
+    mandatory_repayments = np.zeros_like(annual_incomes)
+    has_rate = tax_bracket_rates != 0
+    # Same expression as the scalar path so both produce bit for bit identical amounts
+    mandatory_repayments[has_rate] = annual_incomes[has_rate] / (100 / tax_bracket_rates[has_rate])
+    return mandatory_repayments
+
+
+def simulate_repayments_batch(hecs_debts, index_rate: IndexRate, mandatory_hecs_tax_repayments, voluntary_repayments=0,
+                              max_years: int = MAX_SIMULATION_YEARS) -> BatchRepaymentResults:
+    """Vectorised ``simulate_repayments`` over arrays of debts and repayments.
+
+    Every row is stepped a year at a time with the same arithmetic as the scalar engine, and rows are dropped
+    from the working arrays as soon as they are repaid or found to never be repaid. Every row shares the same
+    indexation rate in a given year, so an ``IndexationSchedule`` costs one lookup per year, not per row.
+    """
+    if not isinstance(index_rate, IndexationSchedule):
+        index_rate = IndexationSchedule.flat(index_rate)
+    rates = index_rate.rates
+    period = index_rate.period
+
+    hecs_debts, mandatory_hecs_tax_repayments, voluntary_repayments = np.broadcast_arrays(
+        _as_float_array(hecs_debts), _as_float_array(mandatory_hecs_tax_repayments),
+        _as_float_array(voluntary_repayments))
+
+    row_count = hecs_debts.shape[0]
+    months = np.zeros(row_count, dtype=np.int64)
+    total_indexation = np.zeros(row_count, dtype=np.float64)
+    never_repaid = np.zeros(row_count, dtype=bool)
+
+    # Working arrays only hold the rows still being simulated
+    rows = np.arange(row_count)
+    balances = hecs_debts.copy()
+    voluntary = voluntary_repayments.copy()
+    monthly_mandatory = mandatory_hecs_tax_repayments / 12
+    monthly_repayments = voluntary + monthly_mandatory
+    row_indexation = np.zeros(row_count, dtype=np.float64)
+    # Balances at the start of the current schedule period, a flat rate is a period of one year
+    period_start_balances = balances
+
+    for year in range(max_years):
+        if rows.size == 0:
+            break
+
+        index_rate = rates[year % period]
+        indexed_balances = ((balances - voluntary) * (index_rate + 1)) - monthly_mandatory
+        row_indexation += indexed_balances * index_rate
+
+        repaid_at_indexation = indexed_balances <= 0
+
+        months_to_repay = np.full(rows.size, np.inf)
+        makes_repayments = monthly_repayments > 0
+        months_to_repay[makes_repayments] = np.ceil(indexed_balances[makes_repayments] /
+                                                    monthly_repayments[makes_repayments])
+        repaid_in_year = ~repaid_at_indexation & (months_to_repay < 12)
+
+        year_end_balances = indexed_balances - (11 * monthly_repayments)
+        period_end = (year + 1) % period == 0
+        if period_end:
+            stalled = ~repaid_at_indexation & ~repaid_in_year & (year_end_balances >= period_start_balances)
+        else:
+            stalled = np.zeros(rows.size, dtype=bool)
+
+        finished = repaid_at_indexation | repaid_in_year | stalled
+        finished_rows = rows[finished]
+        months[finished_rows] = year * 12
+        months[rows[repaid_in_year]] += months_to_repay[repaid_in_year].astype(np.int64)
+        never_repaid[rows[stalled]] = True
+        total_indexation[finished_rows] = row_indexation[finished]
+
+        remaining = ~finished
+        rows = rows[remaining]
+        balances = year_end_balances[remaining]
+        period_start_balances = balances if period_end else period_start_balances[remaining]
+        voluntary = voluntary[remaining]
+        monthly_mandatory = monthly_mandatory[remaining]
+        monthly_repayments = monthly_repayments[remaining]
+        row_indexation = row_indexation[remaining]
+
+    months[rows] = max_years * 12
+    never_repaid[rows] = True
+    total_indexation[rows] = row_indexation
+    return BatchRepaymentResults(months, total_indexation, never_repaid)
+
+
+def calculate_batch(annual_incomes, hecs_debts, weekly_repayments, income_threshold_brackets,
+                    yearly_indexation_rates: list,
+                    indexation_schedule: Optional[IndexationSchedule] = None) -> BatchScenarioResults:
+    """Run the calculator for every row of annual income, HECS debt and weekly voluntary repayment.
+
+    Produces the same numbers as building a ``UserHecsTax`` and running ``simulate_repayments`` with and without
+    the voluntary repayments for each row. Indexation follows ``indexation_schedule`` when given, otherwise the
+    flat average of ``yearly_indexation_rates``.
+    """
+    annual_incomes = _as_float_array(annual_incomes)
+    hecs_debts = _as_float_array(hecs_debts)
+    monthly_repayments = (_as_float_array(weekly_repayments) * 52) / 12
+
+    tax_bracket_rates = find_tax_bracket_rates(annual_incomes, income_threshold_brackets)
+    mandatory_repayments = calculate_mandatory_repayments(annual_incomes, tax_bracket_rates)
+
+    if indexation_schedule is None:
+        indexation_schedule = average_indexation_schedule(yearly_indexation_rates)
+
+    involuntary = simulate_repayments_batch(hecs_debts, indexation_schedule, mandatory_repayments)
+    voluntary = simulate_repayments_batch(hecs_debts, indexation_schedule, mandatory_repayments, monthly_repayments)
+
+    return BatchScenarioResults(tax_bracket_rates, mandatory_repayments, indexation_schedule.average_rate,
+                                involuntary, voluntary)
@@ -0,0 +1,55 @@
+from bisect import bisect_right
+from typing import Tuple
+
+
+class CompiledBracketTable:
+    """Immutable repayment bracket lookup built once from the ATO threshold table.
+
+    Each ATO row is ``[minimum, maximum, rate]`` with both bounds inclusive, so a bracket applies from its
+    minimum up to the next bracket's minimum. Only the sorted minimums are kept and ``bisect`` finds the bracket
+    in O(log n), an income sitting exactly on a boundary falls in the bracket that starts there.
+    """
+
+    __slots__ = ("lower_bounds", "rates", "repayment_threshold", "min_rate", "max_rate")
+
+    lower_bounds: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    repayment_threshold: float
+    min_rate: float
+    max_rate: float
+
+    def __init__(self, income_threshold_brackets: list):
+        if not income_threshold_brackets:
+            raise ValueError("Income threshold table is empty")
+
+        brackets = sorted((float(bracket[0]), float(bracket[2])) for bracket in income_threshold_brackets)
+        lower_bounds = tuple(bracket[0] for bracket in brackets)
+        rates = tuple(bracket[1] for bracket in brackets)
+
+        # Lowest income that makes compulsory repayments, the "Below $x" row is the nil bracket
+        repayment_threshold = next((lower_bound for lower_bound, rate in brackets if rate > 0), lower_bounds[-1])
+
+        for name, value in (("lower_bounds", lower_bounds), ("rates", rates),
+                            ("repayment_threshold", repayment_threshold), ("min_rate", min(rates)),
+                            ("max_rate", max(rates))):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self.rates)} brackets, threshold={self.repayment_threshold:,.0f})"
+
+    def rate_for(self, annual_income: float) -> float:
+        bracket_index = bisect_right(self.lower_bounds, annual_income) - 1
+        # Incomes below every bracket (only possible for negative incomes) repay at the lowest rate
+        return self.rates[bracket_index] if bracket_index >= 0 else self.min_rate
+
+
+def compile_bracket_table(income_threshold_brackets) -> CompiledBracketTable:
+    if isinstance(income_threshold_brackets, CompiledBracketTable):
+        return income_threshold_brackets
+    return CompiledBracketTable(income_threshold_brackets)
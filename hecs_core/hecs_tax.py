@@ -0,0 +1,48 @@
+from typing import Union
+
+from hecs_core.bracket_table import CompiledBracketTable, compile_bracket_table
+from hecs_core.rate_schedule import IndexationSchedule
+
+
+class UserHecsTax:
+    # Cheap per request view over a shared CompiledBracketTable, no per instance dict
+    __slots__ = ("user_annual_income", "user_income_hecs_tax_amount", "user_tax_bracket_tax_rate",
+                 "_bracket_table", "tax_brackets_min", "yearly_indexation_rates", "average_yearly_indexation_rate")
+
+    def __init__(self, annual_income: int, income_threshold_brackets,
+                 yearly_indexation_rates: Union[list, IndexationSchedule]):
+        # user info
+        self.user_annual_income: int = annual_income
+        self.user_income_hecs_tax_amount: int = 0
+        self.user_tax_bracket_tax_rate: int = 0
+
+        # brackets, accepts a CompiledBracketTable or the raw ATO threshold table
+        self._bracket_table: CompiledBracketTable = compile_bracket_table(income_threshold_brackets)
+        self.tax_brackets_min: float = self._bracket_table.repayment_threshold
+
+        # indexation rate, accepts the precomputed flat IndexationSchedule or the raw ATO indexation table
+        self.yearly_indexation_rates = yearly_indexation_rates
+        self.average_yearly_indexation_rate = 0
+
+        # calculation on class creation
+        self._find_user_tax_bracket()
+        self._calculate_user_hecs_tax_amount()
+        self._calculate_average_yearly_indexation_rate()
+
+    def _find_user_tax_bracket(self):
+        self.user_tax_bracket_tax_rate = self._bracket_table.rate_for(self.user_annual_income)
+
+    def _calculate_user_hecs_tax_amount(self):
+        # If user income is below minimum repayment threshold, there is nothing to repay
+        if self.user_tax_bracket_tax_rate:
+            self.user_income_hecs_tax_amount = self.user_annual_income / (100 / self.user_tax_bracket_tax_rate)
+
+    def _calculate_average_yearly_indexation_rate(self):
+        if isinstance(self.yearly_indexation_rates, IndexationSchedule):
+            self.average_yearly_indexation_rate = self.yearly_indexation_rates.average_rate
+            return
+
+        yearly_indexation_sum = sum([index[0] for index in self.yearly_indexation_rates])
+        yearly_indexation_length = len(self.yearly_indexation_rates)
+
+        self.average_yearly_indexation_rate = (yearly_indexation_sum / yearly_indexation_length) / 100
@@ -0,0 +1,98 @@
+from math import ceil
+from typing import List, NamedTuple
+
+from hecs_core.bracket_table import CompiledBracketTable, compile_bracket_table
+from hecs_core.rate_schedule import IndexationSchedule, IndexRate
+from hecs_core.repayment_engine import MAX_SIMULATION_YEARS, RepaymentResult
+
+
+class ProjectionYear(NamedTuple):
+    year: int
+    annual_income: float
+    tax_bracket_rate: float
+    mandatory_repayment: float
+    opening_balance: float
+    indexation: float
+    # Compulsory and voluntary repayments made this year, only what was left to pay in the year the debt is cleared
+    repayments: float
+    closing_balance: float
+
+
+class Projection(NamedTuple):
+    repayment: RepaymentResult
+    schedule: List[ProjectionYear]
+
+
+def project_repayments(hecs_debt: float, annual_income: float, income_threshold_brackets, index_rate: IndexRate,
+                       wage_growth_rate: float = 0, threshold_indexation_rate: float = 0,
+                       voluntary_repayment: float = 0, max_years: int = MAX_SIMULATION_YEARS) -> Projection:
+    """Simulate repayments while the income grows by ``wage_growth_rate`` and the thresholds by
+    ``threshold_indexation_rate`` every year.
+
+    The compulsory repayment is re-bracketed at the start of every year. Growing both the income and the
+    thresholds is the same as looking up the income deflated by the threshold indexation in today's table, so the
+    compiled bracket table is reused as is. Each year follows the same monthly steps as ``simulate_repayments``,
+    and with no growth the result is exactly the one ``simulate_repayments`` gives.
+    """
+    bracket_table: CompiledBracketTable = compile_bracket_table(income_threshold_brackets)
+    if not isinstance(index_rate, IndexationSchedule):
+        index_rate = IndexationSchedule.flat(index_rate)
+    rates = index_rate.rates
+    period = index_rate.period
+
+    # A period that doesn't bring the balance down only proves the debt is never repaid when later compulsory
+    # repayments can't be any bigger. The repayment is the income times its bracket rate, so it can grow when the
+    # income itself grows, even while it falls behind the thresholds, or when the bracket can rise because the
+    # income outgrows the thresholds. Neither helps an income in the 0% bracket that can't outgrow the thresholds,
+    # its repayment stays at nothing for good
+    bracket_can_rise = annual_income > 0 and wage_growth_rate > threshold_indexation_rate
+    repayments_can_grow = wage_growth_rate > 0 or bracket_can_rise
+
+    schedule = []
+    balance = period_start_balance = hecs_debt
+    total_indexation = 0
+    income = annual_income
+    threshold_factor = 1.0
+    for year in range(max_years):
+        tax_bracket_rate = bracket_table.rate_for(income / threshold_factor)
+        mandatory_repayment = income / (100 / tax_bracket_rate) if tax_bracket_rate else 0
+        if year % period == 0:
+            # Whole periods are compared, so the repayments have to stop growing from the start of one
+            period_can_stall = not repayments_can_grow or (tax_bracket_rate == 0 and not bracket_can_rise)
+        monthly_mandatory_repayment = mandatory_repayment / 12
+        monthly_repayment = voluntary_repayment + monthly_mandatory_repayment
+
+        rate = rates[year % period]
+        indexed_balance = ((balance - voluntary_repayment) * (rate + 1)) - monthly_mandatory_repayment
+        indexation = indexed_balance * rate
+        total_indexation += indexation
+
+        repaid_months = None
+        if indexed_balance <= 0:
+            repaid_months = 0
+        elif monthly_repayment > 0:
+            months_to_repay = ceil(indexed_balance / monthly_repayment)
+            if months_to_repay < 12:
+                repaid_months = months_to_repay
+
+        if repaid_months is not None:
+            # Whatever the payoff month, the first month's repayments plus what was left after them clears the debt
+            repayments = voluntary_repayment + monthly_mandatory_repayment + indexed_balance
+            schedule.append(ProjectionYear(year, income, tax_bracket_rate, mandatory_repayment, balance, indexation,
+                                           repayments, 0.0))
+            return Projection(RepaymentResult(year * 12 + repaid_months, total_indexation, False), schedule)
+
+        year_end_balance = indexed_balance - (11 * monthly_repayment)
+        schedule.append(ProjectionYear(year, income, tax_bracket_rate, mandatory_repayment, balance, indexation,
+                                       mandatory_repayment + 12 * voluntary_repayment, year_end_balance))
+        balance = year_end_balance
+
+        if (year + 1) % period == 0:
+            if period_can_stall and balance >= period_start_balance:
+                return Projection(RepaymentResult(year * 12, total_indexation, True), schedule)
+            period_start_balance = balance
+
+        income *= wage_growth_rate + 1
+        threshold_factor *= threshold_indexation_rate + 1
+
+    return Projection(RepaymentResult(max_years * 12, total_indexation, True), schedule)
@@ -0,0 +1,65 @@
+from array import array
+from typing import Iterable, Optional, Tuple, Union
+
+
+class IndexationSchedule:
+    """Immutable year by year indexation rates that repeat every ``period`` years.
+
+    A flat rate is a schedule with a period of one, replaying history is a schedule of the historical rates
+    oldest first, repeated once they run out. The rates live in one ``array('d')`` so the engines index them per
+    year as cheaply as the flat rate.
+    """
+
+    __slots__ = ("rates", "period", "average_rate")
+
+    rates: array
+    period: int
+    average_rate: float
+
+    def __init__(self, rates: Iterable[float]):
+        rates = array("d", rates)
+        if not rates:
+            raise ValueError("Indexation schedule needs at least one rate")
+
+        for name, value in (("rates", rates), ("period", len(rates)), ("average_rate", sum(rates) / len(rates))):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.period} years, average={self.average_rate:.4%})"
+
+    @classmethod
+    def flat(cls, rate: float) -> "IndexationSchedule":
+        return cls((rate,))
+
+    @classmethod
+    def from_indexation_table(cls, yearly_indexation_rates: list, last_years: Optional[int] = None
+                              ) -> "IndexationSchedule":
+        """Replay the last ``last_years`` rows of the ATO indexation table, or all of them, oldest first.
+
+        ATO rows are newest first with the rate as a percentage, e.g. ``[[3.9], [0.6], [1.8], ...]``.
+        """
+        rows = yearly_indexation_rates if last_years is None else yearly_indexation_rates[:last_years]
+        return cls(row[0] / 100 for row in reversed(rows))
+
+
+# Anything the repayment engines accept as indexation, one flat rate or a per year schedule
+IndexRate = Union[float, IndexationSchedule]
+
+
+def average_indexation_schedule(yearly_indexation_rates: list) -> IndexationSchedule:
+    # Same sum as UserHecsTax.average_yearly_indexation_rate so the flat schedule matches it exactly
+    yearly_indexation_sum = sum([index[0] for index in yearly_indexation_rates])
+    return IndexationSchedule.flat((yearly_indexation_sum / len(yearly_indexation_rates)) / 100)
+
+
+def indexation_schedules(yearly_indexation_rates: list) -> Tuple[IndexationSchedule, ...]:
+    """Every schedule a scenario can ask for, the flat average at 0 and replaying the last n years at n."""
+    return (average_indexation_schedule(yearly_indexation_rates),) + tuple(
+        IndexationSchedule.from_indexation_table(yearly_indexation_rates, last_years)
+        for last_years in range(1, len(yearly_indexation_rates) + 1))
@@ -0,0 +1,117 @@
+from math import ceil
+from typing import Iterator, NamedTuple
+
+from hecs_core.rate_schedule import IndexRate, IndexationSchedule
+
+# Safety net for debts that shrink so slowly the convergence test never trips, e.g. a zero indexation rate
+MAX_SIMULATION_YEARS = 1000
+
+
+class RepaymentResult(NamedTuple):
+    # Months with a balance still outstanding, the same as len(value_list) from calculate_hecs_repayments
+    months: int
+    total_indexation: float
+    never_repaid: bool
+
+    @property
+    def years(self) -> int:
+        return self.months // 12
+
+
+def simulate_repayments(hecs_debt: float, index_rate: IndexRate, mandatory_hecs_tax_repayment: float,
+                        voluntary_repayment: float = 0, max_years: int = MAX_SIMULATION_YEARS) -> RepaymentResult:
+    """Simulate monthly HECS repayments one indexation year at a time.
+
+    Follows the same monthly steps as ``calculate_hecs_repayments``: every month the voluntary repayment and a
+    twelfth of the compulsory repayment come off the balance, and the first month of every year indexes the
+    balance first. Indexation only happens once a year, so the other 11 months are an arithmetic series and the
+    payoff month inside a year is solved directly instead of stepping through it.
+
+    A debt is never repaid when a full year of repayments doesn't bring the balance down. Each year is the same
+    increasing affine map of the previous balance, so from there on the balance can only grow.
+
+    ``index_rate`` is either one flat rate or an ``IndexationSchedule`` that changes the rate every year. A flat
+    rate is a schedule of one year. With a longer schedule a single year is no longer the same map every time, but
+    a whole period of the schedule is, so the never repaid test compares whole periods instead.
+    """
+    if not isinstance(index_rate, IndexationSchedule):
+        index_rate = IndexationSchedule.flat(index_rate)
+    rates = index_rate.rates
+    period = index_rate.period
+    monthly_mandatory_repayment = mandatory_hecs_tax_repayment / 12
+    monthly_repayment = voluntary_repayment + monthly_mandatory_repayment
+
+    balance = period_start_balance = hecs_debt
+    total_indexation = 0
+    for year in range(max_years):
+        # First month of the year, indexation is applied before the compulsory repayment comes off
+        rate = rates[year % period]
+        indexed_balance = ((balance - voluntary_repayment) * (rate + 1)) - monthly_mandatory_repayment
+        total_indexation += indexed_balance * rate
+
+        if indexed_balance <= 0:
+            return RepaymentResult(year * 12, total_indexation, False)
+
+        # Remaining 11 months of the year only take repayments off
+        if monthly_repayment > 0:
+            months_to_repay = ceil(indexed_balance / monthly_repayment)
+            if months_to_repay < 12:
+                return RepaymentResult(year * 12 + months_to_repay, total_indexation, False)
+
+        balance = indexed_balance - (11 * monthly_repayment)
+        if (year + 1) % period == 0:
+            if balance >= period_start_balance:
+                return RepaymentResult(year * 12, total_indexation, True)
+            period_start_balance = balance
+
+    return RepaymentResult(max_years * 12, total_indexation, True)
+
+
+class ScheduleMonth(NamedTuple):
+    # 1 based, month 1 is the first indexation
+    month: int
+    opening_balance: float
+    indexation: float
+    compulsory_repayment: float
+    voluntary_repayment: float
+    closing_balance: float
+
+
+def iter_repayment_schedule(hecs_debt: float, index_rate: IndexRate, mandatory_hecs_tax_repayment: float,
+                            voluntary_repayment: float = 0,
+                            max_years: int = MAX_SIMULATION_YEARS) -> Iterator[ScheduleMonth]:
+    """Yield the month by month schedule ``simulate_repayments`` summarises, one row at a time.
+
+    Indexation is measured the same way as ``RepaymentResult.total_indexation`` so the column sums to it. The
+    payoff month only shows what was needed to clear the balance, taken off the compulsory repayment first.
+    Nothing is kept between rows, so a schedule of any length streams in constant memory.
+    """
+    if not isinstance(index_rate, IndexationSchedule):
+        index_rate = IndexationSchedule.flat(index_rate)
+    rates = index_rate.rates
+    period = index_rate.period
+    monthly_mandatory_repayment = mandatory_hecs_tax_repayment / 12
+
+    balance = hecs_debt
+    for month in range(max_years * 12):
+        indexation = 0
+        closing_balance = balance - voluntary_repayment
+        if month % 12 == 0:
+            rate = rates[(month // 12) % period]
+            closing_balance = (closing_balance * (rate + 1)) - monthly_mandatory_repayment
+            indexation = closing_balance * rate
+        else:
+            closing_balance -= monthly_mandatory_repayment
+
+        if closing_balance > 0:
+            yield ScheduleMonth(month + 1, balance, indexation, monthly_mandatory_repayment, voluntary_repayment,
+                                closing_balance)
+            balance = closing_balance
+            continue
+
+        overpaid = -closing_balance
+        compulsory_repayment = max(monthly_mandatory_repayment - overpaid, 0)
+        overpaid -= monthly_mandatory_repayment - compulsory_repayment
+        yield ScheduleMonth(month + 1, balance, indexation, compulsory_repayment,
+                            max(voluntary_repayment - overpaid, 0), 0.0)
+        return
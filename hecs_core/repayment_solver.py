@@ -0,0 +1,65 @@
+from math import ceil
+from typing import List, NamedTuple
+
+from hecs_core.rate_schedule import IndexRate
+from hecs_core.repayment_engine import RepaymentResult, simulate_repayments
+
+
+class PayoffPoint(NamedTuple):
+    weekly_repayment: float
+    repayment: RepaymentResult
+
+
+def _weekly_to_monthly(weekly_repayment: float) -> float:
+    return (weekly_repayment * 52) / 12
+
+
+def simulate_weekly_repayments(hecs_debt: float, index_rate: IndexRate, mandatory_hecs_tax_repayment: float,
+                               weekly_repayment: float) -> RepaymentResult:
+    return simulate_repayments(hecs_debt, index_rate, mandatory_hecs_tax_repayment,
+                               _weekly_to_monthly(weekly_repayment))
+
+
+def minimum_weekly_repayment(hecs_debt: float, index_rate: IndexRate, mandatory_hecs_tax_repayment: float,
+                             target_months: int) -> PayoffPoint:
+    """Smallest weekly voluntary repayment, to the cent, that clears the debt within ``target_months``.
+
+    Payoff time only ever shrinks as the weekly repayment grows, so the answer is found by bisecting whole cents
+    over the repayment engine, about 25 simulations for any realistic debt.
+    """
+    def is_repaid_in_time(cents: int) -> bool:
+        repayment = simulate_weekly_repayments(hecs_debt, index_rate, mandatory_hecs_tax_repayment, cents / 100)
+        return not repayment.never_repaid and repayment.months <= target_months
+
+    if is_repaid_in_time(0):
+        return PayoffPoint(0.0, simulate_weekly_repayments(hecs_debt, index_rate, mandatory_hecs_tax_repayment, 0))
+
+    # Repaying the whole debt in the first month always works, grow the bound for unusual negative rates
+    upper_cents = max(ceil(hecs_debt * 12 / 52 * 100), 1)
+    while not is_repaid_in_time(upper_cents):
+        upper_cents *= 2
+
+    lower_cents = 0
+    while upper_cents - lower_cents > 1:
+        middle_cents = (lower_cents + upper_cents) // 2
+        if is_repaid_in_time(middle_cents):
+            upper_cents = middle_cents
+        else:
+            lower_cents = middle_cents
+
+    weekly_repayment = upper_cents / 100
+    return PayoffPoint(weekly_repayment,
+                       simulate_weekly_repayments(hecs_debt, index_rate, mandatory_hecs_tax_repayment,
+                                                  weekly_repayment))
+
+
+def payoff_curve(hecs_debt: float, index_rate: IndexRate, mandatory_hecs_tax_repayment: float,
+                 max_weekly_repayment: float, points: int = 20) -> List[PayoffPoint]:
+    """Payoff time for ``points`` evenly spaced whole dollar weekly repayments from $0 to ``max_weekly_repayment``."""
+    step = max_weekly_repayment / max(points - 1, 1)
+    weekly_repayments = sorted({round(step * point) for point in range(points)})
+
+    return [PayoffPoint(float(weekly_repayment),
+                        simulate_weekly_repayments(hecs_debt, index_rate, mandatory_hecs_tax_repayment,
+                                                   weekly_repayment))
+            for weekly_repayment in weekly_repayments]
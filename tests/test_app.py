@@ -0,0 +1,244 @@
+import asyncio
+import csv
+import io
+import json
+import re
+
+import pytest
+
+pytest.importorskip("starlette_wtf")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+import app as hecs_app  # noqa: E402
+from fixtures.ato_server import load_ato_page  # noqa: E402
+from hecs_core.repayment_engine import ScheduleMonth  # noqa: E402
+from utils.metrics import NEVER_REPAID  # noqa: E402
+from utils.scenarios import SCHEDULE_YEARS  # noqa: E402
+from utils.UserHecsCalculations import parse_ato_table  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    # Tables straight from the saved ATO pages, the startup refresh against the real ATO never runs
+    hecs_app.rate_store.set_tables(parse_ato_table(load_ato_page("thresholds.html")),
+                                   parse_ato_table(load_ato_page("indexation.html"), 2))
+    hecs_app.result_cache.clear()
+    hecs_app.fragment_cache.clear()
+    return TestClient(hecs_app.app)
+
+
+def test_solve_ignores_unknown_query_parameters(client):
+    params = {"annual_income": 60000, "hecs_debt": 80000, "target_years": 5, "utm_source": "newsletter", "_": "x"}
+    response = client.get("/HECS/api/solve", params=params)
+    assert response.status_code == 200
+    assert response.json()["target_years"] == 5
+
+
+def test_solve_rejects_non_numeric_fields(client):
+    response = client.get("/HECS/api/solve", params={"annual_income": "lots", "hecs_debt": 80000, "target_years": 5})
+    assert response.status_code == 400
+    assert response.json() == {"error": "'annual_income' must be a number"}
+
+
+CSRF_TOKEN_PATTERN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+FORM_DATA = {"annual_income": 100000, "hecs_debt": 50000, "weekly_voluntary_repayments": 100}
+
+
+def test_calculator_redirects_to_cacheable_results(client):
+    csrf_token = CSRF_TOKEN_PATTERN.search(client.get("/HECS/calculator").text).group(1)
+    response = client.post("/HECS/calculator", data={**FORM_DATA, "csrf_token": csrf_token},
+                           allow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == ("/HECS/results?annual_income=100000&hecs_debt=50000"
+                                             "&weekly_voluntary_repayments=100")
+
+    # A fresh client, the results url works without the session or CSRF cookie of the form
+    results_client = TestClient(hecs_app.app)
+    response = results_client.get(response.headers["location"])
+    assert response.status_code == 200
+    assert "Approximate voluntary repayment length" in response.text
+    # Nothing tied to one visitor, so shared caches can keep it
+    assert 'name="csrf_token"' not in response.text
+    assert "set-cookie" not in response.headers
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    etag = response.headers["etag"]
+
+    response = results_client.get("/HECS/results", params=FORM_DATA, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+
+def test_results_with_invalid_inputs_show_the_form_errors(client):
+    response = client.get("/HECS/results", params={**FORM_DATA, "hecs_debt": "-5"})
+    assert response.status_code == 200
+    assert "Please enter a positive number" in response.text
+    assert "etag" not in response.headers
+
+
+@pytest.mark.parametrize("path", ["/HECS/results?annual_income=100000&hecs_debt=50000&weekly_voluntary_repayments=100",
+                                  "/static/CSS/site_styles.css"])
+def test_each_content_coding_has_its_own_etag(client, path):
+    gzip_response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    identity_response = client.get(path, headers={"Accept-Encoding": "identity"})
+    assert gzip_response.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity_response.headers
+    assert gzip_response.content == identity_response.content
+
+    gzip_etag = gzip_response.headers["etag"]
+    identity_etag = identity_response.headers["etag"]
+    assert gzip_etag == (identity_etag[:-1] + '-gzip"' if identity_etag.endswith('"') else identity_etag + "-gzip")
+
+    for accept_encoding, etag in (("gzip", gzip_etag), ("identity", identity_etag)):
+        response = client.get(path, headers={"Accept-Encoding": accept_encoding, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    for response in (gzip_response, identity_response):
+        assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_every_never_repaid_request_is_counted(client, monkeypatch):
+    params = {"annual_income": 30000, "hecs_debt": 50000, "weekly_voluntary_repayments": 1}
+    before = NEVER_REPAID.value()
+    etag = client.get("/HECS/results", params=params).headers["etag"]
+
+    # Both repeats are answered without calculating the scenario again
+    def calculate_scenario(*args):
+        raise AssertionError("scenario calculated again")
+    monkeypatch.setattr(hecs_app, "calculate_scenario", calculate_scenario)
+    assert client.get("/HECS/results", params=params).status_code == 200
+    assert client.get("/HECS/results", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    # A page served from the fragment cache still counts, a 304 shows no page and isn't counted
+    assert NEVER_REPAID.value() - before == 2
+
+
+def test_streaming_api_is_not_held_back_by_compression(client):
+    scope = {"type": "http", "method": "GET", "path": "/HECS/api/schedule", "root_path": "", "scheme": "http",
+             "query_string": b"annual_income=60000&hecs_debt=80000&weekly_voluntary_repayments=0",
+             "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip, br")], "client": ("test", 1),
+             "server": ("testserver", 80)}
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the whole response is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(hecs_app.app(scope, receive, send))
+
+    start, *bodies = messages
+    assert b"content-encoding" not in dict(start["headers"])
+    # A year of rows per body message, sent as they are produced rather than as one compressed block at the end
+    body_chunks = [message["body"] for message in bodies if message["body"]]
+    assert len(body_chunks) > 1
+    assert json.loads(body_chunks[0].splitlines()[0])["month"] == 1
+
+
+def test_projection_that_never_reaches_a_threshold_stops_early(client):
+    params = {"annual_income": 30000, "hecs_debt": 20000, "wage_growth_rate": 0.02, "threshold_indexation_rate": 0.03}
+    response = client.get("/HECS/api/project", params=params)
+
+    assert response.json()["repayment"]["never_repaid"]
+    assert len(response.json()["schedule"]) == 1
+
+
+def test_long_projection_schedules_are_cut_off(client):
+    # Voluntary repayments only just outpace indexation, so the debt takes well over a century to repay
+    params = {"annual_income": 0, "hecs_debt": 100000, "weekly_voluntary_repayments": 50}
+    projection = client.get("/HECS/api/project", params=params).json()
+
+    assert not projection["repayment"]["never_repaid"]
+    assert projection["repayment"]["months"] > 12 * SCHEDULE_YEARS
+    assert len(projection["schedule"]) == SCHEDULE_YEARS
+    assert projection["schedule_truncated"]
+
+
+SCENARIO = {"annual_income": 90000, "hecs_debt": 30000, "weekly_voluntary_repayments": 50}
+
+
+def test_calculate_single_scenario(client):
+    response = client.post("/HECS/api/calculate", json=SCENARIO)
+    assert response.status_code == 200
+    assert response.headers["x-rate-table-version"] == hecs_app.rate_store.version
+
+    result = response.json()
+    assert {field: result[field] for field in SCENARIO} == SCENARIO
+    assert result["tax_bracket_rate"] == 6.0
+    assert not result["voluntary"]["never_repaid"]
+    assert result["voluntary"]["months"] < result["involuntary"]["months"]
+
+    response = client.post("/HECS/api/calculate", json={**SCENARIO, "hecs_debt": -1})
+    assert response.status_code == 400
+    assert response.json() == {"error": "'hecs_debt' must be a positive number"}
+
+
+def test_calculate_list_keeps_errors_in_request_order(client):
+    payloads = [SCENARIO, {"hecs_debt": 1000}, {**SCENARIO, "annual_income": 150000}, "scenario",
+                {**SCENARIO, "weekly_voluntary_repayments": True}, {**SCENARIO, "hecs_debt": 5000}]
+    response = client.post("/HECS/api/calculate", json=payloads)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == len(payloads)
+    assert lines[1] == {"error": "'annual_income' is required"}
+    assert lines[3] == {"error": "Scenario must be a JSON object"}
+    assert lines[4] == {"error": "'weekly_voluntary_repayments' must be a number"}
+    for position in (0, 2, 5):
+        assert lines[position] == client.post("/HECS/api/calculate", json=payloads[position]).json()
+
+
+def test_calculate_ndjson_body_with_a_bad_line(client):
+    body = "\n".join([json.dumps(SCENARIO), "{not json", "", json.dumps({**SCENARIO, "hecs_debt": 5000})]) + "\n"
+    response = client.post("/HECS/api/calculate", data=body.encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+
+    # Blank lines are skipped, a line that isn't JSON gets an error line in its place
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3
+    assert lines[0]["hecs_debt"] == 30000
+    assert lines[1] == {"error": "Line is not valid JSON"}
+    assert lines[2]["hecs_debt"] == 5000
+
+
+def test_calculate_rejects_bodies_that_are_not_scenarios(client):
+    assert client.post("/HECS/api/calculate", data=b"{not json").status_code == 400
+    response = client.post("/HECS/api/calculate", json="scenario")
+    assert response.status_code == 400
+    assert response.json() == {"error": "Request body must be a scenario or a list of scenarios"}
+
+
+def test_schedule_csv(client):
+    params = {**SCENARIO, "format": "csv"}
+    response = client.get("/HECS/api/schedule", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="hecs-schedule.csv"'
+
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == list(ScheduleMonth._fields)
+    result = client.post("/HECS/api/calculate", json=SCENARIO).json()["voluntary"]
+    assert len(rows) == result["months"] + 1
+    assert [int(row[0]) for row in rows] == list(range(1, len(rows) + 1))
+    assert float(rows[-1][-1]) == 0
+    assert sum(float(row[2]) for row in rows) == pytest.approx(result["total_indexation"])
+
+    # Same rows as the NDJSON form
+    ndjson_rows = [json.loads(line) for line in client.get("/HECS/api/schedule", params=SCENARIO).text.splitlines()]
+    assert [[float(value) for value in row] for row in rows] == [list(row.values()) for row in ndjson_rows]
+
+
+def test_schedule_rejects_unknown_formats(client):
+    response = client.get("/HECS/api/schedule", params={**SCENARIO, "format": "xml"})
+    assert response.status_code == 400
+    assert response.json() == {"error": "'format' must be one of ndjson, csv"}
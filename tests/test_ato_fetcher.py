@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from fixtures.ato_server import THRESHOLD_PATH, load_ato_page, running_ato_server  # noqa: E402
+from utils.ato_fetcher import AtoFetcher  # noqa: E402
+
+THRESHOLD_PAGE = load_ato_page("thresholds.html")
+
+
+@pytest.fixture
+def ato_server():
+    with running_ato_server() as server:
+        yield server
+
+
+def test_concurrent_fetches_share_one_upstream_request(ato_server):
+    async def main():
+        fetcher = AtoFetcher()
+        try:
+            return await asyncio.gather(*(fetcher.fetch(ato_server.threshold_url) for _ in range(500))), fetcher
+        finally:
+            await fetcher.aclose()
+
+    pages, fetcher = asyncio.run(main())
+    assert all(page == THRESHOLD_PAGE for page in pages)
+    assert fetcher.upstream_requests == 1
+    assert ato_server.request_count == 1
+
+
+def test_repeat_fetch_is_revalidated(ato_server):
+    async def main():
+        fetcher = AtoFetcher()
+        try:
+            first = await fetcher.fetch(ato_server.threshold_url)
+            # Same ETag with a different body, only a 304 answer gives back the first body
+            etag = ato_server.pages[THRESHOLD_PATH][1]
+            ato_server.pages[THRESHOLD_PATH] = (b"<p>changed</p>", etag)
+            return first, await fetcher.fetch(ato_server.threshold_url), fetcher
+        finally:
+            await fetcher.aclose()
+
+    first, second, fetcher = asyncio.run(main())
+    assert first == second == THRESHOLD_PAGE
+    assert fetcher.upstream_requests == ato_server.request_count == 2
+
+
+def test_shared_fetch_survives_a_cancelled_caller(ato_server):
+    async def main():
+        fetcher = AtoFetcher()
+        try:
+            cancelled = asyncio.ensure_future(fetcher.fetch(ato_server.threshold_url))
+            waiting = asyncio.ensure_future(fetcher.fetch(ato_server.threshold_url))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            return await waiting, fetcher
+        finally:
+            await fetcher.aclose()
+
+    page, fetcher = asyncio.run(main())
+    assert page == THRESHOLD_PAGE
+    assert fetcher.upstream_requests == ato_server.request_count == 1
@@ -0,0 +1,73 @@
+import re
+
+import pytest
+
+from fixtures.ato_server import load_ato_page
+from utils.UserHecsCalculations import PARSER_BACKENDS, TableValuesFromURL, default_parser_backend
+
+THRESHOLD_VALUES = [
+    [0.0, 48361.0, 0.0], [48361.0, 55836.0, 1.0], [55837.0, 59186.0, 2.0], [59187.0, 62738.0, 2.5],
+    [62739.0, 66502.0, 3.0], [66503.0, 70492.0, 3.5], [70493.0, 74722.0, 4.0], [74723.0, 79206.0, 4.5],
+    [79207.0, 83958.0, 5.0], [83959.0, 88996.0, 5.5], [88997.0, 94336.0, 6.0], [94337.0, 99996.0, 6.5],
+    [99997.0, 105996.0, 7.0], [105997.0, 112355.0, 7.5], [112356.0, 119097.0, 8.0], [119098.0, 126243.0, 8.5],
+    [126244.0, 133818.0, 9.0], [133819.0, 141847.0, 9.5], [141848.0, 141848.0, 10.0],
+]
+# Newest first, the date columns are cut off
+INDEXATION_VALUES = [[3.9], [0.6], [1.8], [1.8], [1.9], [1.5], [1.5], [2.1], [2.9], [2.4], [3.1], [2.6], [1.9],
+                     [4.1], [4.4], [3.1], [2.8], [2.4]]
+
+
+@pytest.fixture(params=sorted(PARSER_BACKENDS))
+def backend(request):
+    if request.param == "lxml":
+        pytest.importorskip("lxml")
+    return request.param
+
+
+def with_entities(page: str) -> str:
+    # The same text the way some ATO pages spell it, as character references
+    return page.replace("$", "&#36;").replace("–", "&ndash;").replace("%", "&#x25;")
+
+
+def without_closing_paragraphs(page: str) -> str:
+    # Closing the cell has to end the row element too
+    return page.replace("</p></td>", "</td>")
+
+
+@pytest.mark.parametrize("transform", [str, with_entities, without_closing_paragraphs],
+                         ids=["as_saved", "entities", "unclosed_p"])
+@pytest.mark.parametrize("page, cut_leading_rows, expected", [
+    ("thresholds.html", 0, THRESHOLD_VALUES),
+    ("indexation.html", 2, INDEXATION_VALUES),
+])
+def test_table_values(backend, transform, page, cut_leading_rows, expected):
+    text = transform(load_ato_page(page))
+    assert TableValuesFromURL.from_text(text, cut_leading_rows, backend).table_values == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100])
+def test_table_values_across_chunk_boundaries(backend, chunk_size):
+    text = with_entities(load_ato_page("thresholds.html"))
+    table = TableValuesFromURL(text=text, backend=backend, chunk_size=chunk_size)
+    assert table.table_values == THRESHOLD_VALUES
+
+
+def test_only_the_first_table_is_read(backend):
+    page = load_ato_page("thresholds.html")
+    first_table = re.search(r"<table>.*?</table>", page, re.DOTALL).group(0)
+    text = page.replace("</table>", "</table>" + first_table.replace("10.0%", "99.0%"), 1)
+    assert TableValuesFromURL.from_text(text, backend=backend).table_values == THRESHOLD_VALUES
+
+
+def test_default_backend_prefers_lxml():
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        assert default_parser_backend() == "html.parser"
+    else:
+        assert default_parser_backend() == "lxml"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        TableValuesFromURL.from_text(load_ato_page("thresholds.html"), backend="regex")
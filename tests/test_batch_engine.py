@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from hecs_core.batch_engine import calculate_batch, simulate_repayments_batch  # noqa: E402
+from hecs_core.hecs_tax import UserHecsTax  # noqa: E402
+from hecs_core.rate_schedule import IndexationSchedule  # noqa: E402
+from hecs_core.repayment_engine import simulate_repayments  # noqa: E402
+
+INCOME_THRESHOLD_BRACKETS = [[0, 48361, 0], [48361, 55836, 1], [55836, 59186, 2], [59186, 62738, 2.5],
+                             [62738, 66502, 3], [66502, 70492, 3.5], [70492, 74722, 4], [74722, 79206, 4.5],
+                             [79206, 83958, 5], [83958, 88996, 5.5], [88996, 94336, 6], [94336, 99996, 6.5],
+                             [99996, 105996, 7], [105996, 112355, 7.5], [112355, 119097, 8], [119097, 126243, 8.5],
+                             [126243, 133818, 9], [133818, 141847, 9.5], [141847, 141847, 10]]
+YEARLY_INDEXATION_RATES = [[3.9], [0.6], [1.8], [1.8], [1.9], [1.5], [1.5], [2.9], [2.1], [2.4]]
+
+
+@pytest.fixture
+def scenarios():
+    generator = np.random.default_rng(0)
+    row_count = 2000
+    hecs_debts = generator.integers(100, 200000, row_count).astype(np.float64)
+    mandatory_repayments = generator.integers(0, 20000, row_count).astype(np.float64)
+    mandatory_repayments[::7] = 0
+    voluntary_repayments = generator.random(row_count) * 800
+    voluntary_repayments[::3] = 0
+    return hecs_debts, mandatory_repayments, voluntary_repayments
+
+
+def assert_batch_equals_scalar(batch_results, hecs_debts, index_rate, mandatory_repayments, voluntary_repayments):
+    for row, (hecs_debt, mandatory_repayment, voluntary_repayment) in enumerate(
+            zip(hecs_debts, mandatory_repayments, voluntary_repayments)):
+        scalar_result = simulate_repayments(float(hecs_debt), index_rate, float(mandatory_repayment),
+                                            float(voluntary_repayment))
+        assert (int(batch_results.months[row]), float(batch_results.total_indexation[row]),
+                bool(batch_results.never_repaid[row])) == tuple(scalar_result), row
+
+
+@pytest.mark.parametrize("index_rate", [0, 0.0249, 0.039, IndexationSchedule((0.024, 0.006, 0.039))])
+def test_batch_equals_scalar(scenarios, index_rate):
+    hecs_debts, mandatory_repayments, voluntary_repayments = scenarios
+    batch_results = simulate_repayments_batch(hecs_debts, index_rate, mandatory_repayments, voluntary_repayments)
+    assert_batch_equals_scalar(batch_results, hecs_debts, index_rate, mandatory_repayments, voluntary_repayments)
+
+
+def test_batch_max_years_cap():
+    hecs_debts = np.array([200000.0, 50000.0, 30000.0])
+    voluntary_repayments = np.array([8.34, 0.0, 0.0])
+    mandatory_repayments = np.array([0.0, 3000.0, 0.0])
+
+    batch_results = simulate_repayments_batch(hecs_debts, 0.0001, mandatory_repayments, voluntary_repayments)
+    assert_batch_equals_scalar(batch_results, hecs_debts, 0.0001, mandatory_repayments, voluntary_repayments)
+    # Shrinking too slowly to repay within the cap, repaid, and never shrinking at all
+    assert batch_results.never_repaid.tolist() == [True, False, True]
+    assert batch_results.months[0] == 1000 * 12
+
+    batch_results = simulate_repayments_batch(hecs_debts, 0.02, mandatory_repayments, voluntary_repayments,
+                                              max_years=5)
+    # Still shrinking when the cap is reached
+    assert batch_results.months[1] == 5 * 12
+    assert batch_results.never_repaid[1]
+
+
+def test_calculate_batch_equals_user_hecs_tax():
+    generator = np.random.default_rng(1)
+    annual_incomes = generator.integers(0, 200000, 500)
+    hecs_debts = generator.integers(100, 150000, 500)
+    weekly_repayments = generator.integers(0, 300, 500)
+
+    batch = calculate_batch(annual_incomes, hecs_debts, weekly_repayments, INCOME_THRESHOLD_BRACKETS,
+                            YEARLY_INDEXATION_RATES)
+
+    for row in range(500):
+        user_hecs_tax = UserHecsTax(int(annual_incomes[row]), INCOME_THRESHOLD_BRACKETS, YEARLY_INDEXATION_RATES)
+        index_rate = user_hecs_tax.average_yearly_indexation_rate
+        mandatory_repayment = user_hecs_tax.user_income_hecs_tax_amount
+        monthly_repayment = (int(weekly_repayments[row]) * 52) / 12
+
+        assert batch.average_yearly_indexation_rate == index_rate
+        assert batch.tax_bracket_rates[row] == user_hecs_tax.user_tax_bracket_tax_rate
+        assert batch.mandatory_repayments[row] == mandatory_repayment
+        for batch_results, voluntary_repayment in ((batch.involuntary, 0), (batch.voluntary, monthly_repayment)):
+            scalar_result = simulate_repayments(int(hecs_debts[row]), index_rate, mandatory_repayment,
+                                                voluntary_repayment)
+            assert (int(batch_results.months[row]), float(batch_results.total_indexation[row]),
+                    bool(batch_results.never_repaid[row])) == tuple(scalar_result), row
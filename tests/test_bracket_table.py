@@ -0,0 +1,51 @@
+import pytest
+
+from fixtures.ato_server import load_ato_page
+from hecs_core.bracket_table import CompiledBracketTable
+from hecs_core.hecs_tax import UserHecsTax
+from hecs_core.rate_schedule import average_indexation_schedule
+from utils.UserHecsCalculations import parse_ato_table
+
+INCOME_THRESHOLD_BRACKETS = parse_ato_table(load_ato_page("thresholds.html"))
+YEARLY_INDEXATION_RATES = parse_ato_table(load_ato_page("indexation.html"), 2)
+
+
+@pytest.fixture(scope="module")
+def bracket_table():
+    return CompiledBracketTable(INCOME_THRESHOLD_BRACKETS)
+
+
+@pytest.mark.parametrize("annual_income, rate", [
+    # Nil bracket up to the repayment threshold, the threshold itself repays
+    (48360, 0.0),
+    (48361, 1.0),
+    # Both ends of a bracket are inclusive
+    (55836, 1.0),
+    (55837, 2.0),
+    # Top bracket starts where the one below it ends
+    (141847, 9.5),
+    (141848, 10.0),
+])
+def test_rate_for_bracket_boundaries(bracket_table, annual_income, rate):
+    assert bracket_table.rate_for(annual_income) == rate
+
+
+def test_compiled_table_is_immutable(bracket_table):
+    with pytest.raises(AttributeError):
+        bracket_table.rates = (0.0,)
+    with pytest.raises(AttributeError):
+        bracket_table.repayment_threshold = 0
+    with pytest.raises(AttributeError):
+        del bracket_table.lower_bounds
+    with pytest.raises(AttributeError):
+        bracket_table.cached_rate = 1.0
+
+    assert bracket_table.repayment_threshold == 48361
+
+
+def test_user_hecs_tax_takes_the_average_from_a_schedule(bracket_table):
+    from_table = UserHecsTax(60000, bracket_table, YEARLY_INDEXATION_RATES)
+    from_schedule = UserHecsTax(60000, bracket_table, average_indexation_schedule(YEARLY_INDEXATION_RATES))
+
+    assert from_schedule.average_yearly_indexation_rate == from_table.average_yearly_indexation_rate
+    assert from_schedule.user_income_hecs_tax_amount == from_table.user_income_hecs_tax_amount
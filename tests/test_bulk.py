@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bulk
+from fixtures.ato_server import load_ato_page
+from utils.rate_store import RateStore
+from utils.UserHecsCalculations import parse_ato_table
+
+
+@pytest.fixture(autouse=True)
+def rate_tables(monkeypatch):
+    rate_store = RateStore(None)
+    monkeypatch.setattr(bulk, "_rate_tables", rate_store.set_tables(
+        parse_ato_table(load_ato_page("thresholds.html")), parse_ato_table(load_ato_page("indexation.html"), 2)))
+
+
+def test_passthrough_fields_skip_scenario_and_result_columns():
+    assert bulk.passthrough_fields(["employee_id", "annual_income", "hecs_debt", "name", "error"]) == (
+        "employee_id", "name")
+    assert bulk.passthrough_fields(None) == ()
+
+
+def test_calculate_chunk_copies_other_columns():
+    rows = [{"employee_id": "E1", "name": "Alex", "annual_income": "90000", "hecs_debt": "30000",
+             "weekly_voluntary_repayments": "50"},
+            {"employee_id": "E2", "name": "Sam", "annual_income": "abc", "hecs_debt": "20000",
+             "weekly_voluntary_repayments": ""}]
+    copied_fields = ("employee_id", "name")
+    output = [dict(zip(copied_fields + bulk.OUTPUT_FIELDS, row)) for row in bulk.calculate_chunk(rows, copied_fields)]
+
+    assert [len(row) for row in output] == [len(copied_fields + bulk.OUTPUT_FIELDS)] * 2
+    assert output[0]["employee_id"] == "E1" and output[0]["name"] == "Alex"
+    assert output[0]["annual_income"] == 90000 and output[0]["error"] is None
+    assert output[1]["employee_id"] == "E2"
+    assert output[1]["error"] == "'annual_income' must be a number"
+
+
+def test_bulk_does_not_load_the_web_stack():
+    # A fresh interpreter, the test session itself has Starlette loaded already
+    script = "import json, sys, bulk; print(json.dumps(sorted(sys.modules)))"
+    completed = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(bulk.__file__)),
+                               capture_output=True, text=True, check=True)
+    top_level_modules = {name.split(".")[0] for name in json.loads(completed.stdout)}
+    assert not top_level_modules & {"starlette", "starlette_wtf", "jinja2", "wtforms", "httpx"}
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from fixtures.ato_server import load_ato_page
+from hecs_core.hecs_tax import UserHecsTax
+from hecs_core.projection import project_repayments
+from hecs_core.repayment_engine import MAX_SIMULATION_YEARS, simulate_repayments
+from utils.UserHecsCalculations import parse_ato_table
+
+
+@pytest.fixture(scope="module")
+def income_threshold_brackets():
+    return parse_ato_table(load_ato_page("thresholds.html"))
+
+
+def test_no_growth_matches_simulate_repayments(income_threshold_brackets):
+    generator = random.Random(0)
+    for _ in range(1000):
+        hecs_debt = generator.randint(100, 200000)
+        annual_income = generator.randint(0, 200000)
+        index_rate = generator.choice([0, 0.0249, 0.039, generator.random() * 0.08])
+        voluntary_repayment = generator.choice([0, generator.random() * 800])
+        mandatory_repayment = UserHecsTax(annual_income, income_threshold_brackets, [[0]]).user_income_hecs_tax_amount
+
+        projection = project_repayments(hecs_debt, annual_income, income_threshold_brackets, index_rate,
+                                        voluntary_repayment=voluntary_repayment)
+        assert projection.repayment == simulate_repayments(hecs_debt, index_rate, mandatory_repayment,
+                                                           voluntary_repayment)
+
+
+def test_repayments_are_what_was_paid(income_threshold_brackets):
+    voluntary_repayment = 100
+    projection = project_repayments(100000, 120000, income_threshold_brackets, 0.03, 0.03, 0.02, voluntary_repayment)
+    *full_years, payoff_year = projection.schedule
+
+    for year in full_years:
+        assert year.repayments == year.mandatory_repayment + 12 * voluntary_repayment
+    assert 0 < payoff_year.repayments <= payoff_year.mandatory_repayment + 12 * voluntary_repayment
+
+    # Interest is charged on the balance left after the first month's voluntary repayment
+    interest = sum((year.opening_balance - voluntary_repayment) * 0.03 for year in projection.schedule)
+    assert sum(year.repayments for year in projection.schedule) == pytest.approx(100000 + interest)
+
+
+def test_income_growing_slower_than_thresholds_can_still_repay(income_threshold_brackets):
+    projection = project_repayments(300000, 200000, income_threshold_brackets, 0.07, 0.03, 0.035)
+
+    # The balance grows at first, but the repayments grow with the income until they overtake the indexation
+    assert projection.schedule[0].closing_balance > 300000
+    assert not projection.repayment.never_repaid
+
+
+def test_shrinking_repayments_are_never_repaid_early(income_threshold_brackets):
+    projection = project_repayments(300000, 100000, income_threshold_brackets, 0.05, 0, 0.02)
+
+    assert projection.repayment.never_repaid
+    assert len(projection.schedule) == 1
+
+
+def test_income_falling_below_the_thresholds_stops_early(income_threshold_brackets):
+    # Income drops below the repayment threshold for good, the first year with nothing repaid ends it
+    projection = project_repayments(50000, 60000, income_threshold_brackets, 0.02, 0.01, 0.03)
+
+    assert projection.repayment.never_repaid
+    assert projection.repayment.months < MAX_SIMULATION_YEARS * 12
+    assert projection.schedule[-1].tax_bracket_rate == 0
+    assert all(year.tax_bracket_rate > 0 for year in projection.schedule[:-1])
+
+
+@pytest.mark.parametrize("annual_income, wage_growth_rate, threshold_indexation_rate", [
+    # Below the first threshold, with wages growing slower than the thresholds
+    (30000, 0.02, 0.03),
+    # No income at all, however fast it grows
+    (0, 0.05, 0.02),
+])
+def test_income_that_never_reaches_a_threshold_stops_early(income_threshold_brackets, annual_income,
+                                                           wage_growth_rate, threshold_indexation_rate):
+    projection = project_repayments(20000, annual_income, income_threshold_brackets, 0.02, wage_growth_rate,
+                                    threshold_indexation_rate)
+
+    assert projection.repayment.never_repaid
+    assert len(projection.schedule) == 1
+
+
+def test_income_outgrowing_the_thresholds_reaches_a_repaying_bracket(income_threshold_brackets):
+    projection = project_repayments(20000, 30000, income_threshold_brackets, 0.02, 0.05, 0.02)
+
+    assert projection.schedule[0].tax_bracket_rate == 0
+    assert not projection.repayment.never_repaid
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from fixtures.ato_server import load_ato_page
+from utils.rate_store import RateStore, rate_table_version
+from utils.UserHecsCalculations import parse_ato_table
+
+THRESHOLDS = parse_ato_table(load_ato_page("thresholds.html"))
+INDEXATION = parse_ato_table(load_ato_page("indexation.html"), 2)
+
+
+class CountingLoader:
+    """Stand-in for the ATO loader that counts its calls, fails while ``error`` is set and takes ``delay``."""
+
+    def __init__(self, delay: float = 0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return THRESHOLDS, INDEXATION
+
+
+def test_concurrent_cold_start_loads_once():
+    loader = CountingLoader(delay=0.05)
+    rate_store = RateStore(loader)
+
+    async def main():
+        return await asyncio.gather(*(rate_store.get() for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert loader.calls == 1
+    assert all(tables is results[0] for tables in results)
+
+
+def test_failed_cold_start_fails_every_waiter_together():
+    loader = CountingLoader(delay=0.05, error=ConnectionError("ATO down"))
+    rate_store = RateStore(loader, retry_interval=60)
+
+    async def main():
+        started = time.monotonic()
+        results = await asyncio.gather(*(rate_store.get() for _ in range(10)), return_exceptions=True)
+        # Remembered for retry_interval, the next request fails straight away
+        with pytest.raises(ConnectionError):
+            await rate_store.get()
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(main())
+    assert loader.calls == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert elapsed < 1
+
+
+def test_failed_load_is_retried_after_retry_interval():
+    loader = CountingLoader(error=ConnectionError("ATO down"))
+    rate_store = RateStore(loader, retry_interval=0.05)
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await rate_store.get()
+        await asyncio.sleep(0.06)
+        loader.error = None
+        return await rate_store.get()
+
+    assert asyncio.run(main()).income_threshold_brackets == THRESHOLDS
+    assert loader.calls == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    loader = CountingLoader(delay=0.05)
+    rate_store = RateStore(loader)
+
+    async def main():
+        cancelled = asyncio.ensure_future(rate_store.get())
+        waiting = asyncio.ensure_future(rate_store.get())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await waiting
+
+    assert asyncio.run(main()).income_threshold_brackets == THRESHOLDS
+    assert loader.calls == 1
+
+
+def test_failed_refresh_keeps_the_last_good_tables():
+    loader = CountingLoader(error=ConnectionError("ATO down"))
+    rate_store = RateStore(loader, ttl=60)
+    tables = rate_store.set_tables(THRESHOLDS, INDEXATION, fetched_at=time.time() - 120)
+
+    assert asyncio.run(rate_store.refresh()) is tables
+    assert rate_store.tables is tables
+    assert loader.calls == 1
+
+
+def test_tables_go_stale_after_ttl():
+    rate_store = RateStore(CountingLoader(), ttl=60)
+    assert rate_store.is_stale()
+
+    tables = rate_store.set_tables(THRESHOLDS, INDEXATION, fetched_at=1000)
+    assert not rate_store.is_stale(now=1059)
+    assert rate_store.is_stale(now=1060)
+
+    # Fresh tables are served without asking the loader again
+    rate_store.set_tables(THRESHOLDS, INDEXATION)
+    assert asyncio.run(rate_store.refresh()) is not tables
+    assert rate_store._loader.calls == 0
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshot_path = str(tmp_path / "rates.json")
+    loader = CountingLoader()
+    tables = asyncio.run(RateStore(loader, snapshot_path=snapshot_path).refresh())
+
+    rate_store = RateStore(CountingLoader(), snapshot_path=snapshot_path)
+    assert rate_store.load_snapshot()
+    assert rate_store.tables.version == tables.version
+    assert rate_store.tables.fetched_at == tables.fetched_at
+    assert rate_store.tables.income_threshold_brackets == THRESHOLDS
+    assert rate_store.tables.yearly_indexation_rates == INDEXATION
+
+
+def test_snapshot_not_matching_its_version_is_rejected(tmp_path):
+    snapshot_path = tmp_path / "rates.json"
+    rate_store = RateStore(CountingLoader(), snapshot_path=str(snapshot_path))
+    rate_store._write_snapshot(rate_store.set_tables(THRESHOLDS, INDEXATION))
+
+    snapshot = json.loads(snapshot_path.read_text())
+    snapshot["yearly_indexation_rates"][0][0] += 1
+    assert rate_table_version(snapshot["income_threshold_brackets"],
+                              snapshot["yearly_indexation_rates"]) != snapshot["version"]
+    snapshot_path.write_text(json.dumps(snapshot))
+
+    rate_store = RateStore(CountingLoader(), snapshot_path=str(snapshot_path))
+    assert not rate_store.load_snapshot()
+    assert rate_store.tables is None
+
+
+def test_missing_or_broken_snapshot_is_ignored(tmp_path):
+    snapshot_path = tmp_path / "rates.json"
+    assert not RateStore(CountingLoader(), snapshot_path=str(snapshot_path)).load_snapshot()
+
+    snapshot_path.write_text("{not json")
+    assert not RateStore(CountingLoader(), snapshot_path=str(snapshot_path)).load_snapshot()
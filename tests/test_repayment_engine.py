@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from hecs_core.rate_schedule import IndexationSchedule
+from hecs_core.repayment_engine import MAX_SIMULATION_YEARS, iter_repayment_schedule, simulate_repayments
+
+
+def monthly_reference(hecs_debt, index_rate, mandatory_hecs_tax_repayment, voluntary_repayment, max_months):
+    """``calculate_hecs_repayments`` as a loop, with a month cap standing in for its RecursionError.
+
+    ``index_rate`` can also be a list of yearly rates, repeated once they run out.
+    """
+    index_rates = index_rate if isinstance(index_rate, list) else [index_rate]
+    value_list = []
+    indexed_list = []
+    while len(value_list) < max_months:
+        if voluntary_repayment:
+            hecs_debt = hecs_debt - voluntary_repayment
+
+        if len(value_list) % 12 == 0:
+            index_rate = index_rates[(len(value_list) // 12) % len(index_rates)]
+            hecs_debt = (hecs_debt * (index_rate + 1)) - (mandatory_hecs_tax_repayment / 12)
+            indexed_list.append(hecs_debt * index_rate)
+        else:
+            hecs_debt = hecs_debt - (mandatory_hecs_tax_repayment / 12)
+
+        if hecs_debt <= 0:
+            return len(value_list), sum(indexed_list), False
+        value_list.append(hecs_debt)
+    return len(value_list), sum(indexed_list), True
+
+
+def random_scenarios(count, seed=0):
+    generator = random.Random(seed)
+    for _ in range(count):
+        yield (generator.randint(100, 200000),
+               generator.choice([0, 0.006, 0.0249, 0.039, generator.random() * 0.08]),
+               generator.choice([0, generator.randint(0, 20000)]),
+               generator.choice([0, generator.random() * 800]))
+
+
+@pytest.mark.parametrize("hecs_debt, index_rate, mandatory_repayment, voluntary_repayment",
+                         list(random_scenarios(500)))
+def test_matches_monthly_reference(hecs_debt, index_rate, mandatory_repayment, voluntary_repayment):
+    result = simulate_repayments(hecs_debt, index_rate, mandatory_repayment, voluntary_repayment)
+    months, total_indexation, never_repaid = monthly_reference(hecs_debt, index_rate, mandatory_repayment,
+                                                               voluntary_repayment, MAX_SIMULATION_YEARS * 12)
+
+    assert result.never_repaid == never_repaid
+    if not never_repaid:
+        assert result.months == months
+        # The engine takes 11 months of repayments off in one step, so only the last few bits can differ
+        assert result.total_indexation == pytest.approx(total_indexation, rel=1e-9, abs=1e-9)
+
+
+def test_repaid_by_first_indexation():
+    months, total_indexation, _ = monthly_reference(100, 0.03, 5000, 0, 12)
+    assert months == 0
+    assert simulate_repayments(100, 0.03, 5000, 0) == (0, total_indexation, False)
+
+
+@pytest.mark.parametrize("hecs_debt, index_rate, mandatory_repayment, voluntary_repayment", [
+    # Income below the repayment threshold, indexation only ever grows the debt
+    (30000, 0.0249, 0, 0),
+    # Repayments smaller than a year of indexation
+    (80000, 0.039, 1500, 0),
+    # Repayments exactly cancel indexation of the first year
+    (120000, 0.05, 6000, 0),
+])
+def test_never_repaid(hecs_debt, index_rate, mandatory_repayment, voluntary_repayment):
+    result = simulate_repayments(hecs_debt, index_rate, mandatory_repayment, voluntary_repayment)
+    assert result.never_repaid
+    # Found by the convergence test long before the cap the recursion would have hit
+    assert result.months < MAX_SIMULATION_YEARS * 12
+    assert monthly_reference(hecs_debt, index_rate, mandatory_repayment, voluntary_repayment,
+                             MAX_SIMULATION_YEARS * 12)[2]
+
+
+def test_max_years_cap_matches_reference():
+    # Shrinks every year but needs more than 1000 years to get there
+    result = simulate_repayments(200000, 0.0001, 0, 8.34)
+    months, total_indexation, never_repaid = monthly_reference(200000, 0.0001, 0, 8.34, MAX_SIMULATION_YEARS * 12)
+
+    assert never_repaid and result.never_repaid
+    assert result.months == months == MAX_SIMULATION_YEARS * 12
+    assert result.total_indexation == pytest.approx(total_indexation, rel=1e-9)
+
+
+def test_explicit_max_years():
+    months, total_indexation, never_repaid = monthly_reference(50000, 0.02, 3000, 0, 5 * 12)
+    assert never_repaid
+    assert simulate_repayments(50000, 0.02, 3000, 0, max_years=5) == (months, pytest.approx(total_indexation), True)
+
+
+def test_flat_schedule_matches_flat_rate():
+    for scenario in random_scenarios(200, seed=1):
+        hecs_debt, index_rate, mandatory_repayment, voluntary_repayment = scenario
+        assert (simulate_repayments(hecs_debt, IndexationSchedule.flat(index_rate), mandatory_repayment,
+                                    voluntary_repayment)
+                == simulate_repayments(hecs_debt, index_rate, mandatory_repayment, voluntary_repayment))
+
+
+@pytest.mark.parametrize("hecs_debt, _, mandatory_repayment, voluntary_repayment", list(random_scenarios(300, seed=2)))
+def test_schedule_matches_monthly_reference(hecs_debt, _, mandatory_repayment, voluntary_repayment):
+    index_rates = [0.024, 0.021, 0.029, 0.015, 0.006, 0.039, 0.071]
+    result = simulate_repayments(hecs_debt, IndexationSchedule(index_rates), mandatory_repayment, voluntary_repayment)
+    months, total_indexation, never_repaid = monthly_reference(hecs_debt, index_rates, mandatory_repayment,
+                                                               voluntary_repayment, MAX_SIMULATION_YEARS * 12)
+
+    assert result.never_repaid == never_repaid
+    if not never_repaid:
+        assert result.months == months
+        assert result.total_indexation == pytest.approx(total_indexation, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("index_rate", [None, IndexationSchedule([0.024, 0.021, 0.029, 0.015, 0.006, 0.039, 0.071])])
+def test_schedule_matches_simulate_repayments(index_rate):
+    for hecs_debt, flat_rate, mandatory_repayment, voluntary_repayment in random_scenarios(300, seed=3):
+        rate = flat_rate if index_rate is None else index_rate
+        result = simulate_repayments(hecs_debt, rate, mandatory_repayment, voluntary_repayment, max_years=100)
+        rows = list(iter_repayment_schedule(hecs_debt, rate, mandatory_repayment, voluntary_repayment, max_years=100))
+
+        if result.never_repaid:
+            # The schedule runs to the cap, it has no convergence test to stop it early
+            assert rows[-1].closing_balance > 0
+            continue
+
+        # One row for every month with a balance left, plus the month it is paid off
+        assert len(rows) == result.months + 1
+        assert rows[-1].closing_balance == 0
+        assert [row.month for row in rows] == list(range(1, len(rows) + 1))
+        assert sum(row.indexation for row in rows) == pytest.approx(result.total_indexation, rel=1e-9, abs=1e-9)
+        for previous, row in zip(rows, rows[1:]):
+            assert row.opening_balance == previous.closing_balance
@@ -0,0 +1,89 @@
+import pytest
+
+from utils import result_cache
+from utils.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    return clock
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResultCache(maxsize=3)
+    for key in "abc":
+        cache.set(key, key.upper())
+
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == "A"
+    cache.set("d", "D")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+
+    # Storing an existing key also counts as a use
+    cache.set("a", "A2")
+    cache.set("e", "E")
+    assert cache.get("c") is None
+    assert [cache.get(key) for key in "ade"] == ["A2", "D", "E"]
+    assert len(cache) == 3
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache(ttl=60)
+    cache.set("a", 1)
+
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a", "expired") == "expired"
+    assert len(cache) == 0
+
+
+def test_entries_without_ttl_never_expire(clock):
+    cache = ResultCache()
+    cache.set("a", 1)
+    clock.now += 60 * 60 * 24 * 365
+    assert cache.get("a") == 1
+
+
+def test_new_rate_table_version_clears_the_cache():
+    cache = ResultCache()
+    cache.use_rate_table_version("v1")
+    cache.set("a", 1)
+
+    cache.use_rate_table_version("v1")
+    assert cache.get("a") == 1
+
+    cache.use_rate_table_version("v2")
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_counters(clock):
+    cache = ResultCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.get("missing")
+    cache.set("c", 3)
+    clock.now += 10
+    cache.get("a")
+
+    assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 2, "evictions": 1}
+
+
+def test_zero_maxsize_stores_nothing():
+    cache = ResultCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from fixtures.ato_server import load_ato_page
+from utils.rate_store import RateStore
+from utils.shared_rates import SHARED_MAGIC, SharedRateStore, fcntl, pack_rate_tables, unpack_rate_tables
+from utils.UserHecsCalculations import parse_ato_table
+
+THRESHOLDS = parse_ato_table(load_ato_page("thresholds.html"))
+INDEXATION = parse_ato_table(load_ato_page("indexation.html"), 2)
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return THRESHOLDS, INDEXATION
+
+
+@pytest.fixture
+def tables():
+    return RateStore(None).set_tables(THRESHOLDS, INDEXATION, fetched_at=1234.5)
+
+
+def test_pack_unpack_round_trip(tables):
+    assert unpack_rate_tables(pack_rate_tables(tables)) == (tables.version, 1234.5, THRESHOLDS, INDEXATION)
+
+
+def test_truncated_or_foreign_files_are_rejected(tables):
+    packed = pack_rate_tables(tables)
+
+    assert unpack_rate_tables(b"") is None
+    # Header only, and a header whose cells got cut off
+    assert unpack_rate_tables(packed[:40]) is None
+    assert unpack_rate_tables(packed[:-1]) is None
+    assert unpack_rate_tables(b"NOTRATES" + packed[len(SHARED_MAGIC):]) is None
+
+
+@pytest.mark.skipif(fcntl is None, reason="leader election needs flock")
+def test_follower_picks_up_new_versions_and_takes_over(tmp_path):
+    shared_path = str(tmp_path / "rates.bin")
+    leader_loader = CountingLoader()
+    follower_loader = CountingLoader()
+    leader = SharedRateStore(leader_loader, shared_path=shared_path, poll_interval=0.01)
+    follower = SharedRateStore(follower_loader, shared_path=shared_path, poll_interval=0.01)
+
+    async def main():
+        await leader.start()
+        await follower.start()
+        assert leader.is_leader and not follower.is_leader
+        assert (await follower.get()).version == leader.version
+
+        # A new version published by the leader reaches the follower on its next poll
+        new_thresholds = [row[:2] + [row[2] + 0.5] for row in THRESHOLDS]
+        leader.set_tables(new_thresholds, INDEXATION)
+        await asyncio.sleep(0.05)
+        tables = await follower.get()
+        assert tables.version == leader.version
+        assert tables.income_threshold_brackets == new_thresholds
+
+        await leader.stop()
+        for _ in range(100):
+            if follower.is_leader:
+                break
+            await asyncio.sleep(0.01)
+        assert follower.is_leader
+
+        # The tables it followed are still fresh, taking over doesn't load them again
+        assert (await follower.get()).income_threshold_brackets == new_thresholds
+        await follower.stop()
+
+    asyncio.run(main())
+    assert leader_loader.calls == 1
+    assert follower_loader.calls == 0
@@ -1,89 +1,180 @@
-from bs4 import BeautifulSoup
-import requests
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class _FirstTableHTMLParser(HTMLParser):
+    """Collects the text of every row element inside the first table element, then ignores the rest."""
+
+    # Closing any of these ends a row element the page forgot to close
+    _ROW_CLOSING_TAGS = {"td", "th", "tr"}
 
+    def __init__(self, table_element: str, row_element: str):
+        super().__init__(convert_charrefs=True)
+        self.table_element = table_element
+        self.row_element = row_element
 
-class UserHecsTax:
+        self.rows = []
+        self.done = False
+        self._in_table = False
+        self._in_row = False
+        self._row_text = []
 
-    def __init__(self, annual_income: int, income_threshold_brackets: list, yearly_indexation_rates: list):
-        # user info
-        self.user_annual_income: int = annual_income
-        self.user_income_hecs_tax_amount: int = 0
-        self.user_tax_bracket_tax_rate: int = 0
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
 
-        # brackets
-        self._tax_threshold_brackets: list = income_threshold_brackets
-        self._tax_brackets: list = [number[1] for number in income_threshold_brackets]
-        self._tax_brackets_rates: list = [number[2] for number in income_threshold_brackets]
+        if tag == self.table_element:
+            self._in_table = True
+        elif self._in_table and tag == self.row_element:
+            self._end_row()
+            self._in_row = True
 
-        # max and min tax brackets
-        self._tax_brackets_max: int = max(self._tax_brackets)
-        self.tax_brackets_min: int = min(self._tax_brackets)
-        self._tax_brackets_rate_min: int = min(self._tax_brackets_rates)
-        self._tax_brackets_rate_max: int = max(self._tax_brackets_rates)
+    def handle_endtag(self, tag):
+        if not self._in_table or self.done:
+            return
 
-        # indexation rate
-        self.yearly_indexation_rates = yearly_indexation_rates
-        self.average_yearly_indexation_rate = 0
+        if tag == self.row_element or tag in self._ROW_CLOSING_TAGS:
+            self._end_row()
+        elif tag == self.table_element:
+            self._end_row()
+            self.done = True
 
-        # calculation on class creation
-        self._find_user_tax_bracket()
-        self._calculate_user_hecs_tax_amount()
-        self._calculate_average_yearly_indexation_rate()
+    def handle_data(self, data):
+        if self._in_row and not self.done:
+            self._row_text.append(data)
 
-    def _find_user_tax_bracket(self):
-        for bracket in self._tax_threshold_brackets:
-            bracket_minimum = int(bracket[0])  # min of tax bracket
-            bracket_maximum = int(bracket[1])  # max of tax bracket
+    def _end_row(self):
+        if self._in_row:
+            self.rows.append("".join(self._row_text))
+            self._row_text = []
+            self._in_row = False
 
-            # If annual income within a bracket, set the bracket tax rate
-            if bracket_minimum < self.user_annual_income < bracket_maximum:
-                self.user_tax_bracket_tax_rate = bracket[2]
 
-            # If income is more than the max bracket, set the tax rate to the max tax rate
-            elif self.user_annual_income > self._tax_brackets_max:
-                self.user_tax_bracket_tax_rate = self._tax_brackets_rate_max
+def _iter_rows_html_parser(chunks: Iterable[str], table_element: str, row_element: str) -> Iterator[str]:
+    parser = _FirstTableHTMLParser(table_element, row_element)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.rows
+        parser.rows = []
+        if parser.done:
+            return
 
-            # If income is less than the min bracket, set the tax rate to the min tax rate
-            elif self.user_annual_income < self.tax_brackets_min:
-                self.user_tax_bracket_tax_rate = self._tax_brackets_rate_min
+    parser.close()
+    yield from parser.rows
 
-    def _calculate_user_hecs_tax_amount(self):
-        # If user income is above the max bracket amount, set the tax amount based on the max tax rate
-        if self.user_annual_income > self._tax_brackets_max:
-            self.user_income_hecs_tax_amount = self.user_annual_income / (100 / self._tax_brackets_rate_max)
 
-        else:
-            bracket_tax_rate = self.user_tax_bracket_tax_rate
-            # If user income is below minimum repayment threshold, pass the error
-            try:
-                self.user_income_hecs_tax_amount = self.user_annual_income / (100 / bracket_tax_rate)
-            except ZeroDivisionError:
-                pass
+def _iter_rows_lxml(chunks: Iterable[str], table_element: str, row_element: str) -> Iterator[str]:
+    from lxml import etree
+
+    parser = etree.HTMLPullParser(events=("start", "end"), tag=(table_element, row_element))
+    in_table = False
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if element.tag == table_element:
+                if event == "end":
+                    return
+                in_table = True
+            elif in_table and event == "end":
+                yield "".join(element.itertext())
+
+
+PARSER_BACKENDS: Dict[str, Callable[[Iterable[str], str, str], Iterator[str]]] = {
+    "html.parser": _iter_rows_html_parser,
+    "lxml": _iter_rows_lxml,
+}
+
+
+def default_parser_backend() -> str:
+    # lxml is an optional speed up, the standard library parser is always available
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+# Everything that isn't a digit, a space or a dot point, e.g. "$", ",", "%" and words like "Below" or "Nil"
+_NON_NUMERIC_CHARACTERS = re.compile(r"[^0-9 .]")
+
 
-    def _calculate_average_yearly_indexation_rate(self):
-        yearly_indexation_sum = sum([index[0] for index in self.yearly_indexation_rates])
-        yearly_indexation_length = len(self.yearly_indexation_rates)
+def _convert_range_cell(text: str) -> List[float]:
+    # "$48,361 – $55,836" -> "48361  55836", the double space separates the lower and upper bounds
+    bounds = _NON_NUMERIC_CHARACTERS.sub("", text).split("  ")
+    bounds[0] = bounds[0].strip()
 
-        self.average_yearly_indexation_rate = (yearly_indexation_sum / yearly_indexation_length) / 100
+    # "Below $48,361" only has an upper bound, the lower bound is 0
+    if len(bounds) == 1:
+        bounds.insert(0, "0")
+
+    # "$141,848 and above" only has a lower bound, make the upper bound equal to it
+    if len(bounds) == 2 and bounds[1] == "":
+        bounds[1] = bounds[0]
+
+    return [float(bound) for bound in bounds]
+
+
+def _convert_rate_cell(text: str) -> float:
+    # "Nil" is empty once the characters are removed
+    rate = _NON_NUMERIC_CHARACTERS.sub("", text).split("  ")[0].replace(" ", "")
+    return float(rate) if rate else 0.0
 
 
 class TableValuesFromURL:
+    """Typed rows of the first table on an ATO rates page.
+
+    The page is fed to an incremental HTML parser which stops as soon as the first ``tbody`` closes, so the rest
+    of the page is never parsed. Each row is its range cell followed by its rate cell, converted to floats in a
+    single pass, e.g. ``[48361.0, 55836.0, 1.0]``, with the first ``cut_leading_rows`` values dropped.
+    """
 
-    def __init__(self, url: str):
+    def __init__(self, url: Optional[str] = None, cut_leading_rows: int = 0, backend: Optional[str] = None,
+                 text: Optional[str] = None, chunk_size: int = 16 * 1024):
         # seen
         self.table_values = []
         self.url = url
+        self.cut_leading_rows = cut_leading_rows
+        self.backend = backend or default_parser_backend()
+        self._chunk_size = chunk_size
+
+        if self.backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend {self.backend!r}, expected one of {sorted(PARSER_BACKENDS)}")
+        if url is None and text is None:
+            raise ValueError("Either a url or the page text is required")
+
+        # request and parse, pages are streamed so the download stops once the first table is read
+        if text is not None:
+            chunks = (text[start:start + chunk_size] for start in range(0, len(text), chunk_size))
+            self._get_table_rows(chunks)
+        else:
+            import requests
 
-        # request and parse
-        req = requests.get(url)
-        self._soup = BeautifulSoup(req.text, "html.parser")
+            with requests.get(url, stream=True) as req:
+                req.raise_for_status()
+                if req.encoding is None:
+                    req.encoding = "utf-8"
+                self._get_table_rows(req.iter_content(chunk_size, decode_unicode=True))
 
         # called on created
-        self._get_table_rows()
         self._convert_table_rows_to_default_type()
 
-    def _get_table_rows(self, table_element: str = "tbody", row_element: str = "p"):
-        table_rows = self._soup.find(table_element).find_all(row_element)
+    @classmethod
+    def from_text(cls, text: str, cut_leading_rows: int = 0, backend: Optional[str] = None) -> "TableValuesFromURL":
+        return cls(cut_leading_rows=cut_leading_rows, backend=backend, text=text)
+
+    def _get_table_rows(self, chunks: Iterable[str], table_element: str = "tbody", row_element: str = "p"):
+        self._table_rows = list(PARSER_BACKENDS[self.backend](chunks, table_element, row_element))
 
     def _convert_table_rows_to_default_type(self):
-        pass
+        # First two rows are the column headings, then the rows alternate between range and rate cells
+        table_rows = self._table_rows[2:]
+        for range_cell, rate_cell in zip(table_rows[::2], table_rows[1::2]):
+            row_values = _convert_range_cell(range_cell)
+            row_values.append(_convert_rate_cell(rate_cell))
+            self.table_values.append(row_values[self.cut_leading_rows:])
+
+
+def parse_ato_table(html: str, cut_leading_rows: int = 0):
+    # Find text in first table in page (first table is current financial year's rates)
+    return TableValuesFromURL.from_text(html, cut_leading_rows).table_values
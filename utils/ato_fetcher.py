@@ -0,0 +1,77 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class _CachedPage:
+    __slots__ = ("etag", "last_modified", "text")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], text: str):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.text = text
+
+
+class AtoFetcher:
+    """Async fetcher for the ATO rate pages.
+
+    Requests go through one pooled keep-alive ``httpx.AsyncClient``, are revalidated with
+    ETag/If-Modified-Since so an unchanged page costs a ``304`` instead of a full download, and concurrent
+    fetches of the same URL are coalesced so only one of them goes upstream.
+    """
+
+    def __init__(self, timeout: float = 10.0, max_connections: int = 10, client: Optional["httpx.AsyncClient"] = None):
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._client = client
+
+        self._pages: Dict[str, _CachedPage] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.upstream_requests = 0
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported on the first fetch, workers that never refresh the tables never load httpx
+            import httpx
+
+            limits = httpx.Limits(max_connections=self._max_connections,
+                                  max_keepalive_connections=self._max_connections)
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=limits, follow_redirects=True)
+        return self._client
+
+    async def fetch(self, url: str) -> str:
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+
+        # Shield the shared fetch so one cancelled caller doesn't cancel it for every other waiter
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str) -> str:
+        headers = {}
+        cached_page = self._pages.get(url)
+        if cached_page is not None:
+            if cached_page.etag:
+                headers["If-None-Match"] = cached_page.etag
+            if cached_page.last_modified:
+                headers["If-Modified-Since"] = cached_page.last_modified
+
+        self.upstream_requests += 1
+        response = await self._get_client().get(url, headers=headers)
+
+        if response.status_code == 304 and cached_page is not None:
+            return cached_page.text
+
+        response.raise_for_status()
+        self._pages[url] = _CachedPage(response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                       response.text)
+        return response.text
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -10,3 +10,30 @@ class ApplicationConfig(object):
 
     if secrets:
         WTF_CSRF_SECRET_KEY = secrets.token_hex()
+
+    # Overridable so the app can be pointed at a local stand-in (see fixtures/ato_server.py)
+    ATO_HELP_THRESHOLD_URL = os.environ.get(
+        "HECS_ATO_THRESHOLD_URL", "https://www.ato.gov.au/Rates/HELP,-TSL-and-SFSS-repayment-thresholds-and-rates/")
+    ATO_HELP_INDEXATION_URL = os.environ.get(
+        "HECS_ATO_INDEXATION_URL", "https://www.ato.gov.au/Rates/Study-and-training-loan-indexation-rates/")
+
+    # ATO rate tables are served from memory and refreshed in the background once they are this old
+    ATO_RATE_TTL_SECONDS = int(os.environ.get("HECS_ATO_RATE_TTL_SECONDS", 60 * 60 * 24))
+    ATO_RATE_RETRY_SECONDS = int(os.environ.get("HECS_ATO_RATE_RETRY_SECONDS", 60 * 5))
+    ATO_RATE_SNAPSHOT_PATH = os.environ.get("HECS_ATO_RATE_SNAPSHOT_PATH", "ato_rate_snapshot.json")
+    # Set when running several workers, one of them refreshes the tables and shares them through this file
+    ATO_SHARED_RATES_PATH = os.environ.get("HECS_ATO_SHARED_RATES_PATH")
+    ATO_SHARED_RATES_POLL_SECONDS = float(os.environ.get("HECS_ATO_SHARED_RATES_POLL_SECONDS", 1))
+
+    # Calculator results are cached per (income, debt, weekly repayment, rate table version)
+    RESULT_CACHE_SIZE = int(os.environ.get("HECS_RESULT_CACHE_SIZE", 10000))
+    RESULT_CACHE_TTL_SECONDS = int(os.environ.get("HECS_RESULT_CACHE_TTL_SECONDS", 60 * 60))
+
+    # Results pages are revalidated with their ETag once this old, static files are cached for longer
+    RESULTS_MAX_AGE_SECONDS = int(os.environ.get("HECS_RESULTS_MAX_AGE_SECONDS", 60 * 5))
+    STATIC_MAX_AGE_SECONDS = int(os.environ.get("HECS_STATIC_MAX_AGE_SECONDS", 60 * 60 * 24))
+    # Smaller responses aren't worth compressing
+    COMPRESSION_MINIMUM_SIZE = int(os.environ.get("HECS_COMPRESSION_MINIMUM_SIZE", 500))
+
+    # Lets ?profile=1 swap a response for a profiler report, never enable this on a public deployment
+    PROFILING_ENABLED = os.environ.get("HECS_PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
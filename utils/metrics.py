@@ -0,0 +1,190 @@
+# Standard library only, the bulk CLI times its stages through here without loading the web stack. The ASGI
+# middlewares that record and profile HTTP requests live in utils.middleware
+import contextlib
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds, from sub-millisecond simulations up to slow ATO fetches
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: bucket counts (not cumulative), sum and count
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+
+            # First bucket whose upper bound is >= value, the +Inf bucket catches everything else
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (("le", _format_value(upper_bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        metric = Counter(name, documentation)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable[[], Optional[float]],
+                       metric_type: str = "gauge"):
+        # Values owned by other objects (cache counters, rate table age) are read at scrape time
+        def collect() -> List[str]:
+            value = callback()
+            if value is None:
+                return []
+            return [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}", f"{name} {_format_value(value)}"]
+
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram("hecs_stage_duration_seconds", "Time spent in each calculator stage")
+REQUEST_DURATION = registry.histogram("hecs_request_duration_seconds", "HTTP request latency by route")
+REQUESTS = registry.counter("hecs_requests_total", "HTTP requests by route and status code")
+ATO_FETCH_FAILURES = registry.counter("hecs_ato_fetch_failures_total", "Failed ATO rate table loads")
+NEVER_REPAID = registry.counter("hecs_never_repaid_total",
+                                "Results pages showing a debt that is never repaid, previously a RecursionError")
+
+
+class RequestTimer:
+    """Stage timings for one request, rendered as a Server-Timing header."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float, Optional[str]]] = []
+
+    def add(self, name: str, duration: float, description: Optional[str] = None):
+        self.stages.append((name, duration, description))
+
+    def server_timing(self) -> str:
+        entries = []
+        for name, duration, description in self.stages:
+            entry = f"{name};dur={duration * 1000:.3f}"
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current_request_timer: contextvars.ContextVar[Optional[RequestTimer]] = contextvars.ContextVar(
+    "current_request_timer", default=None)
+
+
+@contextlib.contextmanager
+def request_timer() -> Iterator[RequestTimer]:
+    timer = RequestTimer()
+    token = _current_request_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_request_timer.reset(token)
+
+
+@contextlib.contextmanager
+def timed_stage(name: str, description: Optional[str] = None) -> Iterator[None]:
+    """Time a stage into the stage histogram, and into the current request's Server-Timing if there is one."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.observe(duration, stage=name)
+        timer = _current_request_timer.get()
+        if timer is not None:
+            timer.add(name, duration, description)
+
+
+def mark_stage(name: str, description: Optional[str] = None):
+    # Zero length entry, e.g. to tell a cache hit apart in Server-Timing
+    timer = _current_request_timer.get()
+    if timer is not None:
+        timer.add(name, 0, description)
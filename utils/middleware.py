@@ -0,0 +1,100 @@
+import io
+import time
+from typing import Tuple
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.metrics import REQUEST_DURATION, REQUESTS
+
+
+class MetricsMiddleware:
+    """Records latency and status code of every HTTP request, keyed on a bounded set of route labels."""
+
+    def __init__(self, app: ASGIApp, routes: Tuple[str, ...] = ()):
+        self.app = app
+        self.routes = set(routes)
+
+    def _route_label(self, path: str) -> str:
+        if path in self.routes:
+            return path
+        if path.startswith("/static/"):
+            return "/static"
+        return "other"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_label(scope["path"])
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start, route=route)
+            REQUESTS.inc(route=route, status=str(status_code))
+
+
+class ProfilerMiddleware:
+    """Profiles a single request when ``?profile=1`` is added and profiling is enabled.
+
+    Uses the pyinstrument sampling profiler when it is installed and falls back to cProfile. The page itself is
+    thrown away and the profile report is returned in its place.
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = False, trigger: str = "profile"):
+        self.app = app
+        self.enabled = enabled
+        self.trigger = trigger
+
+    def _is_requested(self, scope: Scope) -> bool:
+        if not self.enabled or scope["type"] != "http":
+            return False
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return query.get(self.trigger, ["0"])[0] not in ("", "0", "false")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._is_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async def discard(message: Message):
+            pass
+
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+            body, content_type = report.getvalue().encode(), b"text/plain; charset=utf-8"
+        else:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+            body, content_type = profiler.output_html().encode(), b"text/html; charset=utf-8"
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
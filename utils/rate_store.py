@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional, Tuple
+
+from hecs_core.bracket_table import CompiledBracketTable
+from hecs_core.rate_schedule import IndexationSchedule, indexation_schedules
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk snapshot layout changes, older snapshots are then ignored
+SNAPSHOT_FORMAT = 1
+
+
+class RateTables(NamedTuple):
+    income_threshold_brackets: list
+    yearly_indexation_rates: list
+    version: str
+    fetched_at: float
+    # Compiled once per rate table version and shared by every request
+    bracket_table: CompiledBracketTable
+    # Flat average at 0, replaying the last n years of indexation at n
+    indexation_schedules: Tuple[IndexationSchedule, ...]
+
+    @property
+    def average_indexation_schedule(self) -> IndexationSchedule:
+        return self.indexation_schedules[0]
+
+
+def rate_table_version(income_threshold_brackets: list, yearly_indexation_rates: list) -> str:
+    # Content hash of both tables, changes only when the ATO rates themselves change
+    payload = json.dumps([income_threshold_brackets, yearly_indexation_rates], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class RateStore:
+    """In-memory store for the ATO threshold and indexation tables.
+
+    Tables are loaded once, served from memory for ``ttl`` seconds and refreshed by a background task
+    on the event loop. Every successful load is written to ``snapshot_path`` so a cold start or an ATO
+    outage still serves the last good tables without touching the network on the request path.
+
+    Only one load runs at a time and every caller that needs the tables meanwhile waits on that same load.
+    A failed load is remembered for ``retry_interval`` seconds, so callers in that window get the last good
+    tables, or the same error when there are none, without another trip to the ATO.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Tuple[list, list]]], snapshot_path: Optional[str] = None,
+                 ttl: float = 60 * 60 * 24, retry_interval: float = 60 * 5):
+        self._loader = loader
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+
+        self._tables: Optional[RateTables] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Monotonic time and error of the last failed load, cleared by a successful one
+        self._last_failure: Optional[Tuple[float, Exception]] = None
+        self._refresh_loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def tables(self) -> Optional[RateTables]:
+        return self._tables
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._tables.version if self._tables else None
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        if self._tables is None:
+            return True
+        now = time.time() if now is None else now
+        return now - self._tables.fetched_at >= self.ttl
+
+    def set_tables(self, income_threshold_brackets: list, yearly_indexation_rates: list,
+                   fetched_at: Optional[float] = None) -> RateTables:
+        version = rate_table_version(income_threshold_brackets, yearly_indexation_rates)
+        self._tables = RateTables(income_threshold_brackets, yearly_indexation_rates, version,
+                                  time.time() if fetched_at is None else fetched_at,
+                                  CompiledBracketTable(income_threshold_brackets),
+                                  indexation_schedules(yearly_indexation_rates))
+        return self._tables
+
+    async def get(self) -> RateTables:
+        # Only the very first request of a cold start without a snapshot has to wait on the ATO
+        if self._tables is None:
+            return await self.refresh()
+
+        if self.is_stale():
+            self._schedule_refresh()
+
+        return self._tables
+
+    async def refresh(self) -> RateTables:
+        if self._tables is not None and not self.is_stale():
+            return self._tables
+
+        refresh_task = self._schedule_refresh()
+        if refresh_task is None:
+            # The last load failed less than retry_interval ago, don't send every waiting request to the ATO
+            if self._tables is None:
+                raise self._last_failure[1]
+            return self._tables
+
+        # Shielded so a caller that gives up doesn't cancel the load everyone else is waiting on
+        return await asyncio.shield(refresh_task)
+
+    async def _load(self) -> RateTables:
+        try:
+            income_threshold_brackets, yearly_indexation_rates = await self._loader()
+        except Exception as error:
+            self._last_failure = (time.monotonic(), error)
+            if self._tables is None:
+                raise
+            logger.exception("ATO rate refresh failed, serving tables from %s",
+                             time.ctime(self._tables.fetched_at))
+            return self._tables
+
+        self._last_failure = None
+        tables = self.set_tables(income_threshold_brackets, yearly_indexation_rates)
+        self._write_snapshot(tables)
+        return tables
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+
+            if snapshot.get("format") != SNAPSHOT_FORMAT:
+                logger.warning("Ignoring rate snapshot %s with unknown format %r", self.snapshot_path,
+                               snapshot.get("format"))
+                return False
+
+            income_threshold_brackets = snapshot["income_threshold_brackets"]
+            yearly_indexation_rates = snapshot["yearly_indexation_rates"]
+            if rate_table_version(income_threshold_brackets, yearly_indexation_rates) != snapshot["version"]:
+                logger.warning("Ignoring rate snapshot %s, contents do not match its version", self.snapshot_path)
+                return False
+
+        except (OSError, ValueError, KeyError):
+            logger.exception("Unable to read rate snapshot %s", self.snapshot_path)
+            return False
+
+        self.set_tables(income_threshold_brackets, yearly_indexation_rates, snapshot["fetched_at"])
+        return True
+
+    def _write_snapshot(self, tables: RateTables):
+        if not self.snapshot_path:
+            return
+
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "version": tables.version,
+            "fetched_at": tables.fetched_at,
+            "income_threshold_brackets": tables.income_threshold_brackets,
+            "yearly_indexation_rates": tables.yearly_indexation_rates,
+        }
+
+        # Write to a temporary file first so readers never see a half written snapshot
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as snapshot_file:
+                json.dump(snapshot, snapshot_file)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            logger.exception("Unable to write rate snapshot %s", self.snapshot_path)
+
+    def _schedule_refresh(self) -> Optional[asyncio.Task]:
+        """The load in flight, or a new one unless the last one failed within ``retry_interval``."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return self._refresh_task
+
+        if self._last_failure is not None and time.monotonic() - self._last_failure[0] < self.retry_interval:
+            return None
+
+        self._refresh_task = asyncio.get_running_loop().create_task(self._load())
+        return self._refresh_task
+
+    def _next_refresh_delay(self) -> float:
+        if self._tables is None:
+            return self.retry_interval
+
+        # A failed refresh leaves the tables stale, back off instead of retrying in a tight loop
+        expires_in = self._tables.fetched_at + self.ttl - time.time()
+        return expires_in if expires_in > 0 else self.retry_interval
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self._next_refresh_delay())
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("ATO rate refresh failed")
+
+    async def start(self):
+        if not self.load_snapshot():
+            try:
+                await self.refresh()
+            except Exception:
+                # Requests will retry the load, the app should still come up without the ATO
+                logger.exception("Initial ATO rate load failed")
+        elif self.is_stale():
+            self._schedule_refresh()
+
+        if self._refresh_loop_task is None:
+            self._refresh_loop_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        for task in (self._refresh_loop_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+        self._refresh_loop_task = None
+        self._refresh_task = None
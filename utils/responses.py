@@ -0,0 +1,128 @@
+from typing import Iterable, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response, StreamingResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Content codings the compression middleware can apply
+CONTENT_CODINGS = ("gzip", "br")
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body is produced while the request body is still being read.
+
+    The stock response listens for a client disconnect on ``receive`` while it streams, which swallows the
+    request body messages the body iterator is waiting on.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+        if self.background is not None:
+            await self.background()
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers and CDNs keep assets for ``max_age`` seconds.
+
+    ETag and Last-Modified revalidation, and the ``304`` responses for it, already come from StaticFiles.
+    """
+
+    def __init__(self, *args, max_age: int = 60 * 60 * 24, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        return response
+
+
+class ExcludePathsMiddleware:
+    """Runs ``middleware_class`` for every request except those under one of ``exclude_prefixes``.
+
+    Compression middleware buffers a streamed body until it is large enough to compress, which holds back the first
+    rows of a streaming endpoint. Those endpoints are kept out of it this way.
+    """
+
+    def __init__(self, app: ASGIApp, middleware_class: type, exclude_prefixes: Iterable[str] = (), **options):
+        self.app = app
+        self.wrapped_app = middleware_class(app, **options)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+        else:
+            await self.wrapped_app(scope, receive, send)
+
+
+def _strip_content_coding(etag: str) -> Tuple[str, Optional[str]]:
+    if etag.startswith("W/"):
+        return etag, None
+
+    # StaticFiles sends its ETags without the quotes
+    quote = '"' if etag.endswith('"') else ""
+    for coding in CONTENT_CODINGS:
+        suffix = f"-{coding}{quote}"
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + quote, coding
+    return etag, None
+
+
+def _add_content_coding(etag: str, coding: str) -> str:
+    if etag.startswith("W/"):
+        return etag
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{coding}"'
+    return f"{etag}-{coding}"
+
+
+class ContentCodingETagMiddleware:
+    """Gives every content coding of a response its own strong ETag, ``"abc"`` becomes ``"abc-gzip"``.
+
+    A strong validator has to differ between the gzip and identity bodies, otherwise a cache revalidating one can
+    end up serving the other. Sits outside the compression middleware so it sees the final Content-Encoding. The
+    coding is taken off If-None-Match again on the way in, so the app and StaticFiles only compare their own
+    ETags, and put back on the ETag of a ``304`` that answers it.
+
+    Every response with an ETag also gets ``Vary: Accept-Encoding``, uncompressed and ``304`` ones included, so a
+    shared cache keeps the codings apart even for bodies too small to compress.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_coding = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                etags = []
+                for etag in value.decode("latin-1").split(","):
+                    etag, coding = _strip_content_coding(etag.strip())
+                    request_coding = request_coding or coding
+                    etags.append(etag)
+                value = ", ".join(etags).encode("latin-1")
+            headers.append((name, value))
+        scope = {**scope, "headers": headers}
+
+        async def send_with_coded_etag(message: Message):
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(raw=list(message.get("headers", [])))
+                etag = response_headers.get("etag")
+                if etag:
+                    coding = request_coding if message["status"] == 304 else response_headers.get("content-encoding")
+                    if coding:
+                        response_headers["etag"] = _add_content_coding(etag, coding)
+                    if "accept-encoding" not in response_headers.get("vary", "").lower():
+                        response_headers.add_vary_header("Accept-Encoding")
+                    message["headers"] = response_headers.raw
+            await send(message)
+
+        await self.app(scope, receive, send_with_coded_etag)
@@ -0,0 +1,267 @@
+import math
+from collections import defaultdict
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from hecs_core.hecs_tax import UserHecsTax
+from hecs_core.projection import project_repayments
+from hecs_core.rate_schedule import IndexationSchedule
+from hecs_core.repayment_engine import ScheduleMonth, iter_repayment_schedule, simulate_repayments
+from hecs_core.repayment_solver import minimum_weekly_repayment, payoff_curve
+from utils.metrics import mark_stage, timed_stage
+from utils.rate_store import RateTables
+from utils.result_cache import ResultCache
+
+
+# Longest schedule the API returns or streams, for a debt that is never repaid or takes longer than this
+SCHEDULE_YEARS = 100
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+class Scenario(NamedTuple):
+    annual_income: float
+    hecs_debt: float
+    weekly_voluntary_repayments: float = 0
+    # 0 indexes at the flat historical average, n replays the last n years of ATO indexation over and over
+    indexation_years: int = 0
+
+
+class SolveRequest(NamedTuple):
+    annual_income: float
+    hecs_debt: float
+    target_years: float
+    indexation_years: int = 0
+
+
+class ProjectionRequest(NamedTuple):
+    annual_income: float
+    hecs_debt: float
+    weekly_voluntary_repayments: float = 0
+    # Yearly growth as fractions, e.g. 0.03 for 3% a year
+    wage_growth_rate: float = 0
+    threshold_indexation_rate: float = 0
+    indexation_years: int = 0
+
+
+def _parse_number(payload: dict, field: str, default=None):
+    value = payload.get(field, default)
+    if value is None:
+        raise ScenarioError(f"'{field}' is required")
+
+    # bool is an int subclass, but true/false is never a sensible amount of money
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ScenarioError(f"'{field}' must be a number")
+    if value < 0:
+        raise ScenarioError(f"'{field}' must be a positive number")
+    if field == "indexation_years":
+        if value != int(value):
+            raise ScenarioError(f"'{field}' must be a whole number")
+        return int(value)
+    return value
+
+
+def parse_scenario(payload) -> Scenario:
+    if not isinstance(payload, dict):
+        raise ScenarioError("Scenario must be a JSON object")
+
+    return Scenario(*(_parse_number(payload, field, Scenario._field_defaults.get(field))
+                      for field in Scenario._fields))
+
+
+def parse_solve_request(payload) -> SolveRequest:
+    if not isinstance(payload, dict):
+        raise ScenarioError("Request must be a JSON object")
+
+    return SolveRequest(*(_parse_number(payload, field, SolveRequest._field_defaults.get(field))
+                          for field in SolveRequest._fields))
+
+
+def parse_projection_request(payload) -> ProjectionRequest:
+    if not isinstance(payload, dict):
+        raise ScenarioError("Request must be a JSON object")
+
+    return ProjectionRequest(*(_parse_number(payload, field, ProjectionRequest._field_defaults.get(field))
+                               for field in ProjectionRequest._fields))
+
+
+def _repayment_to_dict(months, total_indexation, never_repaid, hecs_debt) -> dict:
+    if never_repaid:
+        return {"months": None, "total_indexation": None, "total_debt": None, "never_repaid": True}
+
+    return {"months": months, "total_indexation": total_indexation, "total_debt": hecs_debt + total_indexation,
+            "never_repaid": False}
+
+
+def _cache_key(scenario: Scenario, rate_tables: RateTables) -> tuple:
+    return (*scenario, rate_tables.version)
+
+
+def _indexation_schedule(rate_tables: RateTables, indexation_years: int) -> IndexationSchedule:
+    # Asking for more years than the ATO publishes replays all of them
+    schedules = rate_tables.indexation_schedules
+    return schedules[min(indexation_years, len(schedules) - 1)]
+
+
+def _calculate_scenario(scenario: Scenario, rate_tables: RateTables) -> dict:
+    with timed_stage("brackets"):
+        user_hecs_tax = UserHecsTax(scenario.annual_income, rate_tables.bracket_table,
+                                    rate_tables.average_indexation_schedule)
+    index_rate = _indexation_schedule(rate_tables, scenario.indexation_years)
+    monthly_repayments = (scenario.weekly_voluntary_repayments * 52) / 12
+
+    with timed_stage("involuntary"):
+        involuntary = simulate_repayments(scenario.hecs_debt, index_rate, user_hecs_tax.user_income_hecs_tax_amount)
+    with timed_stage("voluntary"):
+        voluntary = simulate_repayments(scenario.hecs_debt, index_rate, user_hecs_tax.user_income_hecs_tax_amount,
+                                        monthly_repayments)
+
+    return {
+        **scenario._asdict(),
+        "tax_bracket_rate": float(user_hecs_tax.user_tax_bracket_tax_rate),
+        "mandatory_repayment": float(user_hecs_tax.user_income_hecs_tax_amount),
+        "repayment_threshold": float(user_hecs_tax.tax_brackets_min),
+        "average_indexation_rate": index_rate.average_rate,
+        "involuntary": _repayment_to_dict(*involuntary, scenario.hecs_debt),
+        "voluntary": _repayment_to_dict(*voluntary, scenario.hecs_debt),
+    }
+
+
+def calculate_scenario(scenario: Scenario, rate_tables: RateTables, cache: Optional[ResultCache] = None) -> dict:
+    """Calculate one scenario, results served from ``cache`` are shared and must be treated as read only."""
+    if cache is None:
+        return _calculate_scenario(scenario, rate_tables)
+
+    cache.use_rate_table_version(rate_tables.version)
+    cache_key = _cache_key(scenario, rate_tables)
+    result = cache.get(cache_key)
+    if result is not None:
+        mark_stage("cache", "hit")
+        return result
+
+    result = _calculate_scenario(scenario, rate_tables)
+    cache.set(cache_key, result)
+    return result
+
+
+def iter_scenario_schedule(scenario: Scenario, rate_tables: RateTables) -> Iterator[ScheduleMonth]:
+    """Month by month schedule of the scenario with its weekly voluntary repayments, produced lazily."""
+    user_hecs_tax = UserHecsTax(scenario.annual_income, rate_tables.bracket_table,
+                                rate_tables.average_indexation_schedule)
+    return iter_repayment_schedule(scenario.hecs_debt, _indexation_schedule(rate_tables, scenario.indexation_years),
+                                   user_hecs_tax.user_income_hecs_tax_amount,
+                                   (scenario.weekly_voluntary_repayments * 52) / 12, SCHEDULE_YEARS)
+
+
+def calculate_scenarios(scenarios: Iterable[Scenario], rate_tables: RateTables,
+                        cache: Optional[ResultCache] = None) -> List[dict]:
+    """Calculate a chunk of scenarios together, through the NumPy batch engine when it is installed.
+
+    Scenarios already in ``cache`` are served from it and only the misses are calculated.
+    """
+    scenarios = list(scenarios)
+    results: List[Optional[dict]] = [None] * len(scenarios)
+
+    if cache is not None:
+        cache.use_rate_table_version(rate_tables.version)
+        for position, scenario in enumerate(scenarios):
+            results[position] = cache.get(_cache_key(scenario, rate_tables))
+
+    missing_positions = [position for position, result in enumerate(results) if result is None]
+    missing_scenarios = [scenarios[position] for position in missing_positions]
+    for position, result in zip(missing_positions, _calculate_uncached_scenarios(missing_scenarios, rate_tables)):
+        results[position] = result
+        if cache is not None:
+            cache.set(_cache_key(scenarios[position], rate_tables), result)
+
+    return results
+
+
+def _calculate_uncached_scenarios(scenarios: List[Scenario], rate_tables: RateTables) -> List[dict]:
+    try:
+        from hecs_core.batch_engine import calculate_batch
+    except ImportError:
+        return [_calculate_scenario(scenario, rate_tables) for scenario in scenarios]
+
+    # Every scenario in a batch shares one indexation schedule
+    positions_by_schedule = defaultdict(list)
+    for position, scenario in enumerate(scenarios):
+        positions_by_schedule[_indexation_schedule(rate_tables, scenario.indexation_years)].append(position)
+
+    results: List[Optional[dict]] = [None] * len(scenarios)
+    for schedule, positions in positions_by_schedule.items():
+        group = [scenarios[position] for position in positions]
+        for position, result in zip(positions, _calculate_batch(group, rate_tables, schedule)):
+            results[position] = result
+    return results
+
+
+def _calculate_batch(scenarios: List[Scenario], rate_tables: RateTables, schedule: IndexationSchedule) -> List[dict]:
+    from hecs_core.batch_engine import calculate_batch
+
+    annual_incomes, hecs_debts, weekly_repayments, _ = zip(*scenarios)
+    batch = calculate_batch(annual_incomes, hecs_debts, weekly_repayments, rate_tables.bracket_table,
+                            rate_tables.yearly_indexation_rates, schedule)
+    repayment_threshold = rate_tables.bracket_table.repayment_threshold
+
+    results = []
+    columns = zip(batch.tax_bracket_rates.tolist(), batch.mandatory_repayments.tolist(),
+                  zip(*(column.tolist() for column in batch.involuntary)),
+                  zip(*(column.tolist() for column in batch.voluntary)))
+    for scenario, (tax_bracket_rate, mandatory_repayment, involuntary, voluntary) in zip(scenarios, columns):
+        results.append({
+            **scenario._asdict(),
+            "tax_bracket_rate": tax_bracket_rate,
+            "mandatory_repayment": mandatory_repayment,
+            "repayment_threshold": repayment_threshold,
+            "average_indexation_rate": batch.average_yearly_indexation_rate,
+            "involuntary": _repayment_to_dict(*involuntary, scenario.hecs_debt),
+            "voluntary": _repayment_to_dict(*voluntary, scenario.hecs_debt),
+        })
+    return results
+
+
+def solve_payoff_target(request: SolveRequest, rate_tables: RateTables, curve_points: int = 20) -> dict:
+    """Minimum weekly voluntary repayment to clear the debt within the target years, plus a payoff curve.
+
+    The curve runs from no voluntary repayments up to the weekly amount that clears the debt within a year.
+    """
+    user_hecs_tax = UserHecsTax(request.annual_income, rate_tables.bracket_table,
+                                rate_tables.average_indexation_schedule)
+    index_rate = _indexation_schedule(rate_tables, request.indexation_years)
+    mandatory_repayment = user_hecs_tax.user_income_hecs_tax_amount
+
+    target = minimum_weekly_repayment(request.hecs_debt, index_rate, mandatory_repayment,
+                                      round(request.target_years * 12))
+    one_year = minimum_weekly_repayment(request.hecs_debt, index_rate, mandatory_repayment, 12)
+    curve = payoff_curve(request.hecs_debt, index_rate, mandatory_repayment,
+                         max(one_year.weekly_repayment, target.weekly_repayment), curve_points)
+
+    return {
+        **request._asdict(),
+        "tax_bracket_rate": float(user_hecs_tax.user_tax_bracket_tax_rate),
+        "mandatory_repayment": float(mandatory_repayment),
+        "average_indexation_rate": index_rate.average_rate,
+        "minimum_weekly_repayment": target.weekly_repayment,
+        "repayment": _repayment_to_dict(*target.repayment, request.hecs_debt),
+        "curve": [{"weekly_repayment": point.weekly_repayment,
+                   **_repayment_to_dict(*point.repayment, request.hecs_debt)} for point in curve],
+    }
+
+
+def project_scenario(request: ProjectionRequest, rate_tables: RateTables) -> dict:
+    """Payoff schedule for an income that grows every year, with the repayment bracket worked out again each year."""
+    index_rate = _indexation_schedule(rate_tables, request.indexation_years)
+    projection = project_repayments(request.hecs_debt, request.annual_income, rate_tables.bracket_table, index_rate,
+                                    request.wage_growth_rate, request.threshold_indexation_rate,
+                                    (request.weekly_voluntary_repayments * 52) / 12)
+
+    return {
+        **request._asdict(),
+        "average_indexation_rate": index_rate.average_rate,
+        "repayment": _repayment_to_dict(*projection.repayment, request.hecs_debt),
+        # The projection runs for as long as it takes, the schedule sent back stops at SCHEDULE_YEARS
+        "schedule": [year._asdict() for year in projection.schedule[:SCHEDULE_YEARS]],
+        "schedule_truncated": len(projection.schedule) > SCHEDULE_YEARS,
+    }
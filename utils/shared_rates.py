@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from utils.rate_store import RateStore, RateTables
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows, every process is then its own leader like a plain RateStore
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SHARED_MAGIC = b"HECSRATE"
+# Bump whenever the layout below changes, readers ignore files with any other format
+SHARED_FORMAT = 1
+
+# magic, format, version, fetched_at, threshold rows and columns, indexation rows and columns, then every table
+# cell as a little endian float64, threshold table first
+_HEADER = struct.Struct("<8sI16sdIIII")
+
+
+def pack_rate_tables(tables: RateTables) -> bytes:
+    threshold_columns = len(tables.income_threshold_brackets[0]) if tables.income_threshold_brackets else 0
+    indexation_columns = len(tables.yearly_indexation_rates[0]) if tables.yearly_indexation_rates else 0
+    cells = [cell for row in tables.income_threshold_brackets for cell in row]
+    cells.extend(cell for row in tables.yearly_indexation_rates for cell in row)
+
+    header = _HEADER.pack(SHARED_MAGIC, SHARED_FORMAT, tables.version.encode("ascii"), tables.fetched_at,
+                          len(tables.income_threshold_brackets), threshold_columns,
+                          len(tables.yearly_indexation_rates), indexation_columns)
+    return header + struct.pack(f"<{len(cells)}d", *cells)
+
+
+def unpack_rate_tables(buffer) -> Optional[Tuple[str, float, list, list]]:
+    """Version, fetched_at and both tables from a packed snapshot, read straight out of ``buffer``."""
+    if len(buffer) < _HEADER.size:
+        return None
+
+    (magic, snapshot_format, version, fetched_at, threshold_rows, threshold_columns, indexation_rows,
+     indexation_columns) = _HEADER.unpack_from(buffer)
+    if magic != SHARED_MAGIC or snapshot_format != SHARED_FORMAT:
+        return None
+
+    threshold_cells = threshold_rows * threshold_columns
+    cell_count = threshold_cells + indexation_rows * indexation_columns
+    if len(buffer) < _HEADER.size + cell_count * 8:
+        return None
+
+    cells = struct.unpack_from(f"<{cell_count}d", buffer, _HEADER.size)
+    income_threshold_brackets = [list(cells[start:start + threshold_columns])
+                                 for start in range(0, threshold_cells, threshold_columns)]
+    yearly_indexation_rates = [list(cells[start:start + indexation_columns])
+                               for start in range(threshold_cells, cell_count, indexation_columns)]
+    return version.rstrip(b"\0").decode("ascii"), fetched_at, income_threshold_brackets, yearly_indexation_rates
+
+
+class SharedRateStore(RateStore):
+    """RateStore shared by every worker process of the app through a memory-mapped file.
+
+    The process holding an exclusive lock on ``shared_path + ".lock"`` is the leader: it loads and refreshes the
+    tables like a plain RateStore and publishes every new version to ``shared_path``, replacing the file atomically.
+    Every other process maps the file and picks up a new version when the file changes, checked at most every
+    ``poll_interval`` seconds. Followers try to take the lock on every poll, so a new leader takes over when the
+    old one stops or exits. Only the leader ever talks to the ATO, however many workers there are.
+    """
+
+    def __init__(self, *args, shared_path: str, poll_interval: float = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shared_path = shared_path
+        self.poll_interval = poll_interval
+
+        self._lock_file = None
+        self._mapping: Optional[mmap.mmap] = None
+        self._mapped_identity: Optional[Tuple[int, int]] = None
+        self._next_poll = 0.0
+        self._follow_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def _try_become_leader(self) -> bool:
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+
+        lock_file = open(self.shared_path + ".lock", "a+b")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # Held until stop() or the process exits, the OS releases the lock however the leader dies
+        self._lock_file = lock_file
+        logger.info("Process %d now refreshes the shared ATO rate tables", os.getpid())
+        return True
+
+    def set_tables(self, income_threshold_brackets: list, yearly_indexation_rates: list,
+                   fetched_at: Optional[float] = None) -> RateTables:
+        tables = super().set_tables(income_threshold_brackets, yearly_indexation_rates, fetched_at)
+        if self.is_leader:
+            self._publish(tables)
+        return tables
+
+    def _publish(self, tables: RateTables):
+        directory = os.path.dirname(os.path.abspath(self.shared_path))
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(file_descriptor, "wb") as shared_file:
+                shared_file.write(pack_rate_tables(tables))
+            os.replace(temp_path, self.shared_path)
+        except OSError:
+            logger.exception("Unable to publish shared rate tables to %s", self.shared_path)
+
+    def _sync_from_shared(self) -> bool:
+        """Map the shared file again if it was replaced, and load its tables when their version is new."""
+        try:
+            stat = os.stat(self.shared_path)
+        except OSError:
+            return False
+
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._mapped_identity:
+            return False
+
+        try:
+            with open(self.shared_path, "rb") as shared_file:
+                mapping = mmap.mmap(shared_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        if self._mapping is not None:
+            self._mapping.close()
+        self._mapping = mapping
+        self._mapped_identity = identity
+
+        unpacked = unpack_rate_tables(mapping)
+        if unpacked is None:
+            logger.warning("Ignoring shared rate tables %s with an unknown layout", self.shared_path)
+            return False
+
+        version, fetched_at, income_threshold_brackets, yearly_indexation_rates = unpacked
+        if self._tables is not None and (version, fetched_at) == (self._tables.version, self._tables.fetched_at):
+            return False
+
+        # Building the tables is a single assignment, requests see either the old or the new version
+        super().set_tables(income_threshold_brackets, yearly_indexation_rates, fetched_at)
+        return True
+
+    async def get(self) -> RateTables:
+        if self.is_leader:
+            return await super().get()
+
+        now = time.monotonic()
+        if self._tables is None or now >= self._next_poll:
+            self._next_poll = now + self.poll_interval
+            self._sync_from_shared()
+
+        if self._tables is None:
+            # Nothing published yet, the leader is still on its first load
+            if self._try_become_leader():
+                return await super().get()
+            return await self._wait_for_shared()
+        return self._tables
+
+    async def _wait_for_shared(self, timeout: float = 30) -> RateTables:
+        deadline = time.monotonic() + timeout
+        while self._tables is None:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No shared rate tables published to {self.shared_path}")
+            await asyncio.sleep(min(self.poll_interval, 0.1))
+            self._sync_from_shared()
+        return self._tables
+
+    async def _follow_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            # The lock may also have been taken by a request that found nothing published yet
+            if self._try_become_leader():
+                # Loading the snapshot or refreshing publishes the tables for the other workers
+                await super().start()
+                return
+            self._sync_from_shared()
+
+    async def start(self):
+        if self._try_become_leader():
+            await super().start()
+            return
+
+        self._sync_from_shared()
+        self._follow_task = asyncio.get_running_loop().create_task(self._follow_loop())
+
+    async def stop(self):
+        if self._follow_task is not None and not self._follow_task.done():
+            self._follow_task.cancel()
+            try:
+                await self._follow_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._follow_task = None
+
+        await super().stop()
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+        # Closing the lock file releases the lock, a follower takes over on its next poll
+        if self._lock_file not in (None, True):
+            self._lock_file.close()
+        self._lock_file = None
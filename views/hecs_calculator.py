@@ -1,12 +1,12 @@
 from datetime import datetime
 
-import requests
-from bs4 import BeautifulSoup
 from flask import render_template, Blueprint
 from markupsafe import Markup
 
 from forms.hecs_debt_form import HecsDebtForm
-from utils.UserHecsCalculations import UserHecsTax
+from hecs_core.hecs_tax import UserHecsTax
+from hecs_core.repayment_engine import simulate_repayments
+from utils.UserHecsCalculations import TableValuesFromURL
 
 ATO_HELP_THRESHOLD_URL = "https://www.ato.gov.au/Rates/HELP,-TSL-and-SFSS-repayment-thresholds-and-rates/"
 ATO_HELP_INDEXATION_URL = "https://www.ato.gov.au/Rates/Study-and-training-loan-indexation-rates/"
@@ -38,21 +38,18 @@ def _hecs_calculator():
 
         time_split = str(datetime.astimezone(datetime.now())).split(".")
 
-        try:
-            involuntary_values, total_of_indexed_values = calculate_hecs_repayments(hecs_debt,
-                                                                                    user_hecs_tax.average_yearly_indexation_rate,
-                                                                                    user_hecs_tax.user_income_hecs_tax_amount,
-                                                                                    0, False)
-            # Total indexed amount of debt
-            total_involuntary_index = (sum(total_of_indexed_values))
+        involuntary_result = simulate_repayments(hecs_debt, user_hecs_tax.average_yearly_indexation_rate,
+                                                 user_hecs_tax.user_income_hecs_tax_amount)
+        voluntary_result = simulate_repayments(hecs_debt, user_hecs_tax.average_yearly_indexation_rate,
+                                               user_hecs_tax.user_income_hecs_tax_amount, monthly_repayments)
 
-            voluntary_values, total_of_indexed_values = calculate_hecs_repayments(hecs_debt,
-                                                                                  user_hecs_tax.average_yearly_indexation_rate,
-                                                                                  user_hecs_tax.user_income_hecs_tax_amount,
-                                                                                  monthly_repayments,
-                                                                                  True)
+        if not (involuntary_result.never_repaid or voluntary_result.never_repaid):
+            # Total indexed amount of debt
+            total_involuntary_index = involuntary_result.total_indexation
+            total_voluntary_index = voluntary_result.total_indexation
+            involuntary_months = involuntary_result.months
+            voluntary_months = voluntary_result.months
 
-            total_voluntary_index = (sum(total_of_indexed_values))
             # Append all strings that need to be displayed to the user to a list
             # display_strings.append(f"Annual Income: <b>${annual_income:,}</b>")
             display_strings.append(Markup(f"${annual_income:,}"))
@@ -63,14 +60,14 @@ def _hecs_calculator():
             display_strings.append(Markup(f"${weekly_repayments:,.0f}"))
             display_strings.append(Markup(f"{round(index_rate * 100, 2)}%"))
             display_strings.append(Markup(
-                f"Approximate voluntary repayment length:<br> <b>{int(len(voluntary_values) / 12)} years {len(voluntary_values) % 12} months</b> "
+                f"Approximate voluntary repayment length:<br> <b>{int(voluntary_months / 12)} years {voluntary_months % 12} months</b> "
                 f"<i>(${hecs_debt + total_voluntary_index :,.2f} total debt)</i>"))
             display_strings.append(Markup(
-                f"Approximate involuntary repayment length:<br> <b>{int(len(involuntary_values) / 12)} years {len(involuntary_values) % 12} months</b> "
+                f"Approximate involuntary repayment length:<br> <b>{int(involuntary_months / 12)} years {involuntary_months % 12} months</b> "
                 f"<i>(${hecs_debt + total_involuntary_index:,.2f} total debt)</i>"))
-            year_difference = int(len(involuntary_values) / 12) - int(len(voluntary_values) / 12)
+            year_difference = int(involuntary_months / 12) - int(voluntary_months / 12)
             try:
-                times_quicker = len(involuntary_values) / len(voluntary_values)
+                times_quicker = involuntary_months / voluntary_months
             except ZeroDivisionError:
                 times_quicker = 0
             display_strings.append(
@@ -85,11 +82,10 @@ def _hecs_calculator():
             display_strings.append(
                 Markup(f"With the combined savings and extra earnings, you would have approximately "
                        f"<span style='color:green'><b>${((user_hecs_tax.user_income_hecs_tax_amount * year_difference) * 0.675) + (total_involuntary_index - total_voluntary_index):,.2f}</b> more in your pocket "
-                       f"after <b>{int(len(involuntary_values) / 12)} years</b></span>, compared to <span style='color:red'>$0 if you make no voluntary repayments</span>"))
+                       f"after <b>{int(involuntary_months / 12)} years</b></span>, compared to <span style='color:red'>$0 if you make no voluntary repayments</span>"))
             display_output = True
 
-
-        except RecursionError:
+        else:
             if annual_income < user_hecs_tax.tax_brackets_min:
                 error_strings.append(Markup(
                     f"Your annual income of <b>${annual_income:,}</b> is not high enough to automatically pay HECS debt tax<br><br>"
@@ -139,59 +135,4 @@ def calculate_hecs_repayments(hecs_debt, index_rate, mandatory_hecs_tax_repaymen
 
 
 def get_values_from_ato_table(url: str, cut_leading_rows: int = 0):
-    table_values = []
-
-    req = requests.get(url)
-    soup = BeautifulSoup(req.text, "html.parser")
-
-    # Find text in first table in page (first table is current financial year's rates)
-    table_rows = soup.find("tbody").find_all("p")
-
-    row_values = []
-    for row_index, row in enumerate(table_rows[2:]):
-        if row_index % 2 == 0:  # loop every second row
-            for i in strip_characters(row_index, row.text):  # convert values returned to float
-                row_values.append(float(i))
-        else:
-            row_values.append(float(strip_characters(row_index, row.text)[0]))
-            table_values.append(row_values[cut_leading_rows:])
-            row_values = []
-
-    return table_values
-
-
-def strip_characters(index, text):
-    value_list = []
-
-    string_builder = ""
-    for character in text:
-        # remove all values that aren't digits, dot points or spaces
-        if character.isdigit() or character in [" ", "."]:
-            string_builder += character
-
-    # remove % from percentages and split upper and lower bounds into list values
-    row_text = string_builder.replace('%', "").split("  ")
-
-    # remove leading space
-    if index % 2 == 0:
-        if row_text[0].startswith(" "):
-            row_text[0] = row_text[0].strip()
-
-        # Add 0 as the very first value of the list
-        if len(row_text) == 1:
-            row_text.insert(0, '0')
-
-        # if an upper limit doesn't exist, make upper limit equal to previous value
-        if len(row_text) == 2 and row_text[1] == "":
-            row_text[1] = row_text[0]
-
-        value_list = row_text
-
-    else:  # taxation rate
-        if row_text[0]:  # fix 'Nil' being empty after character removal
-            row_text[0] = row_text[0].replace(" ", "")
-            value_list.append(row_text[0])
-        else:
-            value_list.append('0')
-
-    return value_list
+    return TableValuesFromURL(url, cut_leading_rows).table_values